@@ -0,0 +1,238 @@
+"""
+Filename: decision_table.py
+Description: Compiles a trained network into a decision lookup table. The snake only senses three danger
+bits and the sine of the angle to the food, so for each of the 8 danger combinations the policy is a
+piecewise constant function of one float32. The table stores the angles where the chosen action changes,
+and a decision is a list lookup plus a bisect instead of a forward pass.
+"""
+import json
+import bisect
+import argparse
+import numpy as np
+from src.Brain.neural_network import NeuralNetwork
+from src.Brain.model_manager import ModelManager
+
+ACTIONS = ["forward", "left", "right"]
+DANGERS = ["forward", "left", "right"]
+
+# Sine ranges with fewer float32 values than this are decided value by value with brain.feedforward
+LEAF_SIZE = 64
+
+# Every computed activation bound is widened by this much, far more than float64 rounding can move it
+SLACK = 1e-9
+
+# Leaf ranges one danger mask may need before compiling gives up, only outputs tied over long ranges get there
+MAX_LEAVES = 4096
+
+
+def float_key(value):
+    """Integer that orders float32 values like the floats, neighbouring floats have neighbouring keys"""
+    bits = int(np.float32(value).view(np.int32))
+    return bits if bits >= 0 else -(bits & 0x7FFFFFFF)
+
+
+def key_float(key):
+    bits = key if key >= 0 else (-key) | -0x80000000
+    return float(np.int32(bits).view(np.float32))
+
+
+def key_floats(keys):
+    # Vectorized key_float
+    bits = np.where(keys >= 0, keys, -keys | -0x80000000).astype(np.int32)
+    return bits.view(np.float32)
+
+
+def network_decision(brain, dangers, sine):
+    return int(np.argmax(brain.feedforward(np.array(dangers + [sine], dtype=np.float32))))
+
+
+def output_bounds(brain, dangers, low, high):
+    """
+    Lower and upper bounds of every output over each sine range [low, high], as (outputs, ranges) arrays.
+    First layer pre-activations are linear in the sine, so the range ends bound them, the later layers
+    use interval arithmetic. Sigmoid is monotone, so it maps bounds to bounds.
+
+    """
+    weight, bias = brain.weights[0], brain.biases[0]
+    fixed = np.dot(weight[:, :3], dangers)[:, None] + bias
+    ends = [fixed + weight[:, 3:] * sines.astype(np.float64)[None, :] for sines in (low, high)]
+    lower = brain.sigmoid(np.minimum(*ends) - SLACK)
+    upper = brain.sigmoid(np.maximum(*ends) + SLACK)
+
+    for weight, bias in zip(brain.weights[1:], brain.biases[1:]):
+        positive, negative = np.maximum(weight, 0), np.minimum(weight, 0)
+        lower, upper = (brain.sigmoid(np.dot(positive, lower) + np.dot(negative, upper) + bias - SLACK),
+                        brain.sigmoid(np.dot(positive, upper) + np.dot(negative, lower) + bias + SLACK))
+    return lower, upper
+
+
+def certain_actions(lower, upper):
+    """The action argmax takes on every sine of each range, -1 where the bounds overlap"""
+    actions = np.full(lower.shape[1], -1)
+    for a in range(len(lower)):
+        # argmax picks the first of equal outputs, so a only has to tie with the outputs after it
+        wins = np.ones(lower.shape[1], dtype=bool)
+        for b in range(len(lower)):
+            if b != a:
+                wins &= lower[a] >= upper[b] if a < b else lower[a] > upper[b]
+        actions[wins] = a
+    return actions
+
+
+class DecisionTable:
+    """
+    Per danger mask (forward * 4 + left * 2 + right), the sorted breakpoints and the action taken from
+    each one on: actions[mask][i] holds for sines in [breakpoints[mask][i - 1], breakpoints[mask][i]).
+
+    """
+
+    def __init__(self, breakpoints, actions):
+        self.breakpoints = breakpoints
+        self.actions = actions
+
+    @classmethod
+    def compile(cls, brain):
+        """
+        Exact breakpoints by interval root isolation over the float32 sines in [-1, 1]. A range whose output
+        bounds already fix the argmax takes that action as a whole, any other range is halved, and ranges
+        of fewer than LEAF_SIZE floats are run value by value through brain.feedforward itself. Every float32
+        sine is covered, so the table decides exactly like the network. Raises ValueError when outputs tied
+        over a long range would need more than MAX_LEAVES leaf ranges.
+
+        """
+        if brain.layers[0] != 4 or brain.layers[-1] != len(ACTIONS):
+            raise ValueError(f"Error: Can only compile networks with 4 inputs and 3 outputs, got {brain.layers}.")
+
+        breakpoints, actions = [], []
+        for mask in range(8):
+            dangers = [float(mask >> 2 & 1), float(mask >> 1 & 1), float(mask & 1)]
+
+            # (first key, last key, action) of every decided range, ranges are inclusive float_key spans
+            runs = []
+            ranges = np.array([[float_key(-1.0), float_key(1.0)]], dtype=np.int64)
+            leaves = 0
+            while len(ranges):
+                # Every open range ends in at least one leaf, so give up as soon as there are too many
+                small = ranges[:, 1] - ranges[:, 0] < LEAF_SIZE
+                leaves += small.sum()
+                if leaves + (~small).sum() > MAX_LEAVES:
+                    raise ValueError(f"Error: Outputs are too close to isolate the decisions of danger mask {mask}.")
+                for first, last in ranges[small].tolist():
+                    runs.extend((key, key, network_decision(brain, dangers, key_float(key)))
+                                for key in range(first, last + 1))
+
+                ranges = ranges[~small]
+                lower, upper = output_bounds(brain, np.array(dangers), key_floats(ranges[:, 0]), key_floats(ranges[:, 1]))
+                decided = certain_actions(lower, upper)
+                known = decided >= 0
+                runs.extend(zip(ranges[known, 0].tolist(), ranges[known, 1].tolist(), decided[known].tolist()))
+
+                ranges = ranges[~known]
+                middle = (ranges[:, 0] + ranges[:, 1]) // 2
+                ranges = np.concatenate([np.stack([ranges[:, 0], middle], axis=1),
+                                         np.stack([middle + 1, ranges[:, 1]], axis=1)])
+
+            # Neighbouring runs with the same action merge, a breakpoint is the first float of a new action
+            runs.sort()
+            mask_breakpoints, mask_actions = [], [runs[0][2]]
+            for first, _, action in runs[1:]:
+                if action != mask_actions[-1]:
+                    mask_breakpoints.append(key_float(first))
+                    mask_actions.append(action)
+
+            breakpoints.append(mask_breakpoints)
+            actions.append(mask_actions)
+
+        return cls(breakpoints, actions)
+
+    def decide(self, inputs):
+        """Action index (0 forward, 1 left, 2 right) for one sensor vector, like argmax(feedforward(inputs))"""
+        mask = (inputs[0] > 0.5) * 4 + (inputs[1] > 0.5) * 2 + (inputs[2] > 0.5)
+        return self.actions[mask][bisect.bisect_right(self.breakpoints[mask], inputs[3])]
+
+    def describe(self):
+        """Human readable policy, one line per danger mask"""
+        lines = []
+        for mask in range(8):
+            blocked = [name for bit, name in zip((4, 2, 1), DANGERS) if mask & bit]
+            edges = [-1.0] + self.breakpoints[mask] + [1.0]
+            ranges = [f"[{edges[i]:+.6f}, {edges[i + 1]:+.6f}{']' if i == len(self.actions[mask]) - 1 else ')'} "
+                      f"{ACTIONS[action]}" for i, action in enumerate(self.actions[mask])]
+            lines.append(f"danger {'+'.join(blocked) if blocked else 'none':<20} " + " | ".join(ranges))
+        return lines
+
+    def to_dict(self):
+        return {'breakpoints': self.breakpoints, 'actions': self.actions}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls([list(b) for b in data['breakpoints']], [list(a) for a in data['actions']])
+
+    def save(self, path):
+        try:
+            with open(path, "w") as f:
+                json.dump(self.to_dict(), f, indent=4)
+            return True
+        except Exception as e:
+            print(f"Error saving decision table: {e}")
+            return False
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path) as f:
+                return cls.from_dict(json.load(f))
+        except Exception as e:
+            print(f"Error loading decision table: {e}")
+            return None
+
+
+def compile_model(model_data):
+    brain = NeuralNetwork(model_data['brain']['layers'])
+    brain.load_weights(model_data['brain']['weights'], model_data['brain']['biases'])
+    try:
+        return DecisionTable.compile(brain)
+    except ValueError as e:
+        print(e)
+        return None
+
+
+def count_mismatches(table, brain, count, seed=0):
+    """Decisions that differ from brain.feedforward over random float32 sensor vectors"""
+    rng = np.random.RandomState(seed)
+    inputs = np.column_stack([rng.randint(2, size=(count, 3)), rng.uniform(-1, 1, count)]).astype(np.float32)
+    return sum(table.decide(x) != int(np.argmax(brain.feedforward(x))) for x in inputs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile a saved model into a decision lookup table")
+    parser.add_argument("--model", help="registry hash of the model, the best model by default")
+    parser.add_argument("--output", help="write the table as JSON to this file")
+    parser.add_argument("--verify", type=int, default=0, metavar="N",
+                        help="compare the table against the network on N random inputs")
+    args = parser.parse_args()
+
+    model_manager = ModelManager()
+    model_data = model_manager.load_model(args.model) if args.model else model_manager.load_best_model()
+    if model_data is None:
+        print("No saved model found.")
+        return
+
+    table = compile_model(model_data)
+    if table is None:
+        return
+
+    for line in table.describe():
+        print(line)
+
+    if args.output and table.save(args.output):
+        print(f"Decision table saved to {args.output}")
+
+    if args.verify:
+        brain = NeuralNetwork(model_data['brain']['layers'])
+        brain.load_weights(model_data['brain']['weights'], model_data['brain']['biases'])
+        print(f"{count_mismatches(table, brain, args.verify)} of {args.verify} decisions differ from the network")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,14 @@ Filename: genetic_algorithm.py
 Author: Manaswi Kolani
 Description: This module implements the population, crossover, mutation, selectiona and diversity for the genetic algorithm
 """
+import os
+import random
 import numpy as np
-from src.Brain.neural_network import NeuralNetwork
+from src.Brain.neural_network import NeuralNetwork, NetworkBatch
 from src.game.ai_snake import AISnake
+from src.game.grid import START_DIRECTIONS, center_cell
+from src.game.population_sim import PopulationSimulator, aggregate_episodes, apply_results
+from src.profiling import PhaseTimer
 
 class GeneticAlgorithm:
     def __init__(self, population_size, input_size, hidden_size, output_size, screen_width, screen_height, tile_size):
@@ -16,50 +21,158 @@ class GeneticAlgorithm:
         self.screen_width = screen_width
         self.screen_height = screen_height
         self.tile_size = tile_size
+        self.layers = [input_size, hidden_size, output_size]
+
+        # Every brain's weights and biases are views into one row of this contiguous matrix
+        self.genomes = None
         self.population = self._initialize_population()
         self.generation = 0
         self.elitism_rate = 0.1
+        self.selection_method = "roulette"  # or "sus" for stochastic universal sampling
+        self.evaluation_episodes = 1  # episodes per genome in evaluate_population, on a shared set of seeds
+        self.fitness_aggregate = "mean"  # or a quantile between 0 and 1, e.g. 0.25
+        self.evaluator = None
+        self.fitness_history = []  # [generation, best, average] per finished generation
+        self.recordings = []  # EpisodeRecords of the snakes evaluate_population was asked to record
+        self.timer = PhaseTimer()  # the trainer swaps in its own timer to collect per-generation phases
 
     def _initialize_population(self):
-        layers = [self.input_size, self.hidden_size, self.output_size]
-        population = []
-        
-        for _ in range(self.population_size):
-            snake = AISnake(
-                start_pos=(self.screen_width // 2, self.screen_height // 2),
-                tile_size=self.tile_size,
-                screen_width=self.screen_width,
-                screen_height=self.screen_height,
-                brain=NeuralNetwork(layers)
-            )
-            self._xavier_initialization(snake.brain)
-            population.append(snake)
-        
-        return population
+        parameter_count = sum(rows * cols for rows, cols in NeuralNetwork.parameter_shapes(self.layers))
+        self.genomes = np.empty((self.population_size, parameter_count))
+        self._xavier_initialization_matrix(self.genomes)
 
-    def _xavier_initialization(self, brain):
-        for i, (prev_size, curr_size) in enumerate(zip(brain.layers[:-1], brain.layers[1:])):
-            limit = np.sqrt(6 / (prev_size + curr_size))
-            brain.weights[i] = np.random.uniform(-limit, limit, brain.weights[i].shape)
-            brain.biases[i] = np.random.uniform(-limit, limit, brain.biases[i].shape)
+        return [self._create_snake(genome) for genome in self.genomes]
 
-    def fitness_sharing(self, population):
-        sigma_share = 1.0 
-        
-        for i, snake in enumerate(population):
-            niche_count = 0
-            for j, other_snake in enumerate(population):
-                if i != j:
-                    distance = self._calculate_genetic_distance(snake, other_snake)
-                    if distance < sigma_share:
-                        sharing_value = 1 - (distance / sigma_share)
-                        niche_count += sharing_value
-            
+    def _create_snake(self, genome):
+        return AISnake(
+            start_pos=center_cell(self.screen_width, self.screen_height, self.tile_size),
+            tile_size=self.tile_size,
+            screen_width=self.screen_width,
+            screen_height=self.screen_height,
+            brain=NeuralNetwork(self.layers, genome)
+        )
+
+    def _xavier_initialization_matrix(self, genomes):
+        # Xavier uniform limits per layer, filled for the whole population column block by column block
+        shapes = NeuralNetwork.parameter_shapes(self.layers)
+        layer_count = len(self.layers) - 1
+        offset = 0
+        for i, (rows, cols) in enumerate(shapes):
+            layer = i % layer_count
+            limit = np.sqrt(6 / (self.layers[layer] + self.layers[layer + 1]))
+            genomes[:, offset:offset + rows * cols] = np.random.uniform(-limit, limit, (len(genomes), rows * cols))
+            offset += rows * cols
+
+    def evaluate_population(self, max_steps, workers=1, record=None):
+        """
+        Plays one episode per snake with PopulationSimulator, then evaluates the final fitness.
+        With workers > 1 (or 0 for every core) the episodes are spread over a process pool.
+        With evaluation_episodes > 1 every snake plays that many episodes in the same batch, all snakes
+        on the same per-generation seeds, and its fitness is the fitness_aggregate over them.
+        record lists population indices whose (first) episode is kept as an EpisodeRecord in self.recordings.
+
+        """
+        layers = self.population[0].brain.layers
+        genomes = self._genome_matrix(self.population)
+        episodes = self.evaluation_episodes
+        seeds = np.random.randint(2**31 - 1, size=episodes) if episodes > 1 else None
+        record = None if record is None else np.unique(np.asarray(record, dtype=np.int64))
+        record_rows = None if record is None else record * episodes
+
+        with self.timer.phase("simulation"):
+            if workers == 1:
+                simulator = PopulationSimulator(NetworkBatch.from_genomes(layers, genomes), self.screen_width,
+                                                self.screen_height, self.tile_size, max_steps=max_steps,
+                                                episodes=episodes, seeds=seeds, record_rows=record_rows)
+                results = simulator.run()
+                recordings = simulator.get_recordings()
+            else:
+                # The pool and shared memory modules are only imported when worker processes are wanted
+                from src.Brain.parallel_evaluation import ParallelEvaluator
+
+                if (self.evaluator is None or self.evaluator.capacity < len(genomes) or
+                        self.evaluator.max_steps != max_steps):
+                    self.close()
+                    self.evaluator = ParallelEvaluator(layers, self.screen_width, self.screen_height, self.tile_size,
+                                                       max_steps, capacity=len(genomes), workers=workers or None)
+                results, recordings = self.evaluator.evaluate(genomes, episodes, seeds, record_rows)
+
+            episode_results = results
+            results = aggregate_episodes(results, episodes, self.fitness_aggregate)
+            apply_results(self.population, results)
+            self.recordings = recordings
+
+        with self.timer.phase("evaluate_final_fitness"):
+            for snake in self.population:
+                snake.evaluate_final_fitness()
+
+        if record is not None:
+            # A recording is the snake's first episode, so it keeps that episode's own fitness, not the aggregate
+            fitnesses = np.maximum(0, episode_results['fitness'][record_rows] +
+                                   episode_results['final_fitness_bonus'][record_rows])
+            for snake, recording, fitness in zip(record.tolist(), self.recordings, fitnesses.tolist()):
+                recording.generation, recording.snake = self.generation + 1, snake
+                recording.fitness = fitness
+
+    def close(self):
+        """Shut down the worker pool, if one was started"""
+        if self.evaluator is not None:
+            self.evaluator.close()
+            self.evaluator = None
+
+    def fitness_sharing(self, population, block_size=128):
+        """
+        Shares fitness between snakes with similar genomes. Pairwise distances are worked out in
+        block_size x block_size tiles of the genome matrix, so memory stays bounded for large populations.
+        Sums run in the same order as the pairwise loop over _calculate_genetic_distance, so the
+        shared fitness values are identical to it.
+
+        """
+        sigma_share = 1.0
+        genomes = self._genome_matrix(population)
+        count = len(genomes)
+
+        # Column ranges of every weight and bias array, in the order _calculate_genetic_distance sums them
+        ranges = []
+        offset = 0
+        for rows, cols in NeuralNetwork.parameter_shapes(population[0].brain.layers):
+            ranges.append((offset, offset + rows * cols))
+            offset += rows * cols
+
+        niche_counts = np.zeros(count)
+        for i_start in range(0, count, block_size):
+            i_stop = min(i_start + block_size, count)
+            niche = np.zeros(i_stop - i_start)
+
+            for j_start in range(0, count, block_size):
+                j_stop = min(j_start + block_size, count)
+                squared = (genomes[i_start:i_stop, None, :] - genomes[None, j_start:j_stop, :]) ** 2
+
+                total_distance = 0
+                for start, stop in ranges:
+                    total_distance = total_distance + squared[:, :, start:stop].sum(axis=2)
+                distance = np.sqrt(total_distance / offset)
+
+                sharing = np.where(distance < sigma_share, 1 - (distance / sigma_share), 0.0)
+                diagonal = np.arange(i_start, i_stop)[:, None] == np.arange(j_start, j_stop)[None, :]
+                sharing[diagonal] = 0.0
+
+                # Running sum from the left, in j order, carried over from the previous tile
+                niche = np.cumsum(np.column_stack([niche, sharing]), axis=1)[:, -1]
+
+            niche_counts[i_start:i_stop] = niche
+
+        for snake, niche_count in zip(population, niche_counts):
             if niche_count > 0:
                 snake.shared_fitness = snake.fitness / (1 + niche_count)
             else:
                 snake.shared_fitness = snake.fitness
 
+    def _genome_matrix(self, population):
+        if population is self.population:
+            return self.genomes
+        return np.stack([snake.brain.get_parameters() for snake in population])
+
     def _calculate_genetic_distance(self, snake1, snake2):
         total_distance = 0
         total_elements = 0
@@ -76,95 +189,205 @@ class GeneticAlgorithm:
         
         return np.sqrt(total_distance / total_elements)
 
-    def roulette_wheel_selection(self, population):
-        fitnesses = [getattr(snake, 'shared_fitness', snake.fitness) for snake in population]
-        min_fitness = min(fitnesses)
-        adjusted_fitnesses = [f - min_fitness + 1 for f in fitnesses]
-        
-        total_fitness = sum(adjusted_fitnesses)
-        if total_fitness == 0:
-            return np.random.choice(population)
-        
-        probabilities = [f / total_fitness for f in adjusted_fitnesses]
-        return np.random.choice(population, p=probabilities)
+    def crossover_and_mutate(self, genomes, parent_pairs, alpha=0.5, mutation_rate=0.3):
+        """
+        Arithmetic crossover and whole mutation: builds one child genome per parent index pair
+        with a gather, a blend and a masked overwrite over the whole children matrix.
 
-    def two_point_roulette_selection(self, population):
-        parent1 = self.roulette_wheel_selection(population)
-        parent2 = self.roulette_wheel_selection(population)
-        
-        # Select different parents
-        while parent2 is parent1 and len(population) > 1:
-            parent2 = self.roulette_wheel_selection(population)
-            
-        return parent1, parent2
+        """
+        children = alpha * genomes[parent_pairs[:, 0]] + (1 - alpha) * genomes[parent_pairs[:, 1]]
 
-    def arithmetic_crossover(self, parent1, parent2, alpha=0.5):
-        child_brain = NeuralNetwork(parent1.brain.layers)
-        
-        # Arithmetic crossover for weights 
-        for i in range(len(parent1.brain.weights)):
-            child_brain.weights[i] = (alpha * parent1.brain.weights[i] + 
-                                    (1 - alpha) * parent2.brain.weights[i])
-        
-        # Arithmetic crossover for biases
-        for i in range(len(parent1.brain.biases)):
-            child_brain.biases[i] = (alpha * parent1.brain.biases[i] + 
-                                   (1 - alpha) * parent2.brain.biases[i])
-        
-        return AISnake(
-            start_pos=(self.screen_width // 2, self.screen_height // 2),
-            tile_size=self.tile_size,
-            screen_width=self.screen_width,
-            screen_height=self.screen_height,
-            brain=child_brain
-        )
+        mutation_mask = np.random.random(children.shape) < mutation_rate
+        new_values = np.random.uniform(-1, 1, children.shape)
+        np.copyto(children, new_values, where=mutation_mask)
+        return children
 
-    def whole_mutation(self, snake, mutation_rate=0.3):
-        for i in range(len(snake.brain.weights)):
-            mutation_mask = np.random.random(snake.brain.weights[i].shape) < mutation_rate
-            new_values = np.random.uniform(-1, 1, snake.brain.weights[i].shape)
-            snake.brain.weights[i] = np.where(mutation_mask, new_values, snake.brain.weights[i])
-        
-        for i in range(len(snake.brain.biases)):
-            mutation_mask = np.random.random(snake.brain.biases[i].shape) < mutation_rate
-            new_values = np.random.uniform(-1, 1, snake.brain.biases[i].shape)
-            snake.brain.biases[i] = np.where(mutation_mask, new_values, snake.brain.biases[i])
+    def selection_weights(self, population):
+        # Roulette weights, shifted so the weakest snake still has weight 1
+        fitnesses = np.array([getattr(snake, 'shared_fitness', snake.fitness) for snake in population],
+                             dtype=np.float64)
+        weights = fitnesses - fitnesses.min() + 1
+        if not weights.sum() > 0:
+            weights = np.ones(len(population))
+        return weights
+
+    def _draw_excluding(self, cumulative, weights, excluded):
+        """
+        One roulette draw per entry of excluded, from the wheel with that slot cut out. Matches redrawing
+        until the parent differs, without the retry loop.
+
+        """
+        # Slot starts taken from the cumulative sums themselves, cumulative - weights can round past them
+        below = np.r_[0.0, cumulative[:-1]][excluded]
+        points = np.random.random(len(excluded)) * (cumulative[-1] - weights[excluded])
+
+        # Points past the start of the excluded slot skip over it
+        points += np.where(points >= below, weights[excluded], 0)
+        drawn = np.searchsorted(cumulative, points, side='right')
+        drawn = np.minimum(drawn, len(cumulative) - 1)
+
+        # A single snake has nobody else to pair with, it becomes both parents
+        if len(cumulative) == 1:
+            drawn[:] = excluded
+        return drawn
+
+    def select_parent_pairs(self, population, count, method=None):
+        """
+        Draws count parent pairs for a whole generation as row indices into population.
+        The cumulative distribution is built once, every draw is a vectorized searchsorted.
+        "roulette" draws both parents from the roulette wheel, "sus" uses stochastic
+        universal sampling. The two parents of a pair are always distinct.
+
+        """
+        method = method or self.selection_method
+        if method not in ("roulette", "sus"):
+            raise ValueError(f"Error: Unknown selection method '{method}'.")
+        if count == 0:
+            return np.empty((0, 2), dtype=int)
+
+        weights = self.selection_weights(population)
+        cumulative = np.cumsum(weights)
+        last = len(population) - 1
+
+        if method == "roulette":
+            points = np.random.random(count) * cumulative[-1]
+            first = np.minimum(np.searchsorted(cumulative, points, side='right'), last)
+            second = self._draw_excluding(cumulative, weights, first)
+
+        elif method == "sus":
+            # 2 * count evenly spaced pointers from one random offset, then shuffled into pairs
+            spacing = cumulative[-1] / (2 * count)
+            points = (np.random.random() + np.arange(2 * count)) * spacing
+            selected = np.minimum(np.searchsorted(cumulative, points, side='right'), last)
+            np.random.shuffle(selected)
+            first, second = selected[:count], selected[count:]
+
+            # A snake holding several pointers can land on both sides of a pair, redraw those partners
+            clashes = np.flatnonzero(first == second)
+            second[clashes] = self._draw_excluding(cumulative, weights, first[clashes])
+
+        return np.stack([first, second], axis=1)
 
     def create_next_generation(self):
        
         # Evaluate fitness for all snakes
-        for snake in self.population:
-            snake.evaluate_final_fitness()
-        
-        self.fitness_sharing(self.population)
+        with self.timer.phase("evaluate_final_fitness"):
+            for snake in self.population:
+                snake.evaluate_final_fitness()
         
-        # Sort population by original fitness
-        sorted_population = sorted(self.population, key=lambda snake: snake.fitness, reverse=True)
+        with self.timer.phase("fitness_sharing"):
+            self.fitness_sharing(self.population)
         
-        next_generation = []
+        # Sort population by original fitness (stable, like sorted(..., reverse=True))
+        order = np.argsort([-snake.fitness for snake in self.population], kind='stable')
+        sorted_population = [self.population[i] for i in order]
+        sorted_genomes = self.genomes[order]
         
         # Elitism: Keep top performers unchanged
         elite_count = int(self.population_size * self.elitism_rate)
-        next_generation.extend(sorted_population[:elite_count])
+        child_count = self.population_size - elite_count
         
-        # Create rest of population through crossover and mutation
-        while len(next_generation) < self.population_size:
-            parent1, parent2 = self.two_point_roulette_selection(sorted_population)
-            
-            child = self.arithmetic_crossover(parent1, parent2)
+        # Create rest of population through crossover and mutation, as whole matrices
+        with self.timer.phase("selection"):
+            parent_pairs = self.select_parent_pairs(sorted_population, child_count)
+
+        # Stats before the children's snake objects are reset
+        best_fitness = sorted_population[0].fitness
+        avg_fitness = np.mean([snake.fitness for snake in sorted_population])
+
+        with self.timer.phase("reproduction"):
+            children = self.crossover_and_mutate(sorted_genomes, parent_pairs, mutation_rate=0.3)
             
-            self.whole_mutation(child, mutation_rate=0.3)
+            self.genomes = np.concatenate([sorted_genomes[:elite_count], children])
             
-            next_generation.append(child)
+            # Every snake object is kept and its brain now looks at the new matrix. Elites keep their state,
+            # the rest become the children and start over in place instead of being rebuilt.
+            for snake, genome in zip(sorted_population, self.genomes):
+                snake.brain.bind_parameters(genome)
+            # One draw for all start directions, the same random numbers as a draw per snake
+            directions = np.random.randint(len(START_DIRECTIONS), size=child_count).tolist()
+            for snake, direction in zip(sorted_population[elite_count:], directions):
+                snake.reset(START_DIRECTIONS[direction])
         
-        self.population = next_generation
+        self.population = sorted_population
         self.generation += 1
         
         # Print stats
-        best_fitness = sorted_population[0].fitness
-        avg_fitness = np.mean([snake.fitness for snake in sorted_population])
+        self.fitness_history.append([self.generation, best_fitness, avg_fitness])
         print(f"Generation {self.generation}: Best={best_fitness:.2f}, Avg={avg_fitness:.2f}")
 
+    def save_checkpoint(self, path, extra=None):
+        """
+        Writes the whole GA state to an .npz file: genomes, generation, settings, fitness history
+        and both RNG states. extra holds caller state (e.g. all-time best tracking) as arrays.
+        The file is written next to path first and then swapped in, so a crash never leaves half a checkpoint.
+
+        """
+        _, keys, pos, has_gauss, cached_gaussian = np.random.get_state()
+        version, python_state, python_gauss = random.getstate()
+
+        arrays = {
+            'genomes': self.genomes,
+            'layers': np.array(self.layers),
+            'generation': np.array(self.generation),
+            'elitism_rate': np.array(self.elitism_rate),
+            'selection_method': np.array(self.selection_method),
+            'fitness_history': np.array(self.fitness_history, dtype=np.float64).reshape(-1, 3),
+            'numpy_rng_keys': keys,
+            'numpy_rng_state': np.array([pos, has_gauss]),
+            'numpy_rng_gauss': np.array(cached_gaussian),
+            'python_rng_state': np.array(python_state, dtype=np.int64),
+            'python_rng_info': np.array([version, np.nan if python_gauss is None else python_gauss])
+        }
+        for name, value in (extra or {}).items():
+            arrays['extra_' + name] = np.asarray(value)
+
+        temp_path = path + '.tmp'
+        try:
+            with open(temp_path, 'wb') as f:
+                np.savez(f, **arrays)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+            return True
+
+        except Exception as e:
+            print(f"Error saving checkpoint: {e}")
+            return False
+
+    @staticmethod
+    def read_checkpoint(path):
+        """Reads a checkpoint into a dict of arrays, without touching any GA or RNG state"""
+        with np.load(path) as data:
+            return {name: data[name] for name in data.files}
+
+    def restore_checkpoint(self, checkpoint):
+        """
+        Rebuilds the population from a checkpoint read by read_checkpoint and returns its extra arrays.
+        The RNG states are restored last, so the run continues exactly as it would have without the break.
+
+        """
+        if list(checkpoint['layers']) != self.layers:
+            raise ValueError(f"Error: Checkpoint layers {list(checkpoint['layers'])} do not match {self.layers}.")
+
+        self.close()
+        self.genomes = np.array(checkpoint['genomes'], dtype=np.float64)
+        self.population_size = len(self.genomes)
+        self.population = [self._create_snake(genome) for genome in self.genomes]
+        self.generation = int(checkpoint['generation'])
+        self.elitism_rate = float(checkpoint['elitism_rate'])
+        self.selection_method = str(checkpoint['selection_method'])
+        self.fitness_history = checkpoint['fitness_history'].tolist()
+
+        pos, has_gauss = checkpoint['numpy_rng_state']
+        np.random.set_state(('MT19937', checkpoint['numpy_rng_keys'], int(pos), int(has_gauss),
+                             float(checkpoint['numpy_rng_gauss'])))
+        version, python_gauss = checkpoint['python_rng_info']
+        random.setstate((int(version), tuple(int(value) for value in checkpoint['python_rng_state']),
+                         None if np.isnan(python_gauss) else float(python_gauss)))
+
+        return {name[len('extra_'):]: value for name, value in checkpoint.items() if name.startswith('extra_')}
+
     def get_population(self):
         return self.population
 
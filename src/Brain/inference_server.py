@@ -0,0 +1,209 @@
+"""
+Filename: inference_server.py
+Description: Local inference service for running many games against the same trained models. Models are
+loaded from ModelManager once, and sensor vectors from every game, sent through an in-process queue or a
+Unix socket, are micro-batched into single NetworkBatch forward passes.
+"""
+import os
+import json
+import asyncio
+import argparse
+import numpy as np
+from src.Brain.neural_network import NeuralNetwork, NetworkBatch
+from src.Brain.model_manager import ModelManager
+
+DEFAULT_SOCKET_PATH = "/tmp/evoluvine_inference.sock"
+
+
+class InferenceServer:
+    """
+    Collects decide() requests for up to max_delay seconds (or max_batch_size requests) and answers
+    them with one batched forward pass. Every served model is one row of the same NetworkBatch,
+    so all models need the same layers.
+
+    """
+
+    def __init__(self, model_manager=None, max_batch_size=512, max_delay=0.002):
+        self.model_manager = model_manager or ModelManager()
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+
+        self.networks = []
+        self.model_rows = {}  # model name -> row in the batch
+        self.batch = None
+        self.queue = None
+        self.task = None
+
+    def add_model(self, name, model_data):
+        brain = NeuralNetwork(model_data['brain']['layers'])
+        brain.load_weights(model_data['brain']['weights'], model_data['brain']['biases'])
+
+        if self.networks and brain.layers != self.networks[0].layers:
+            raise ValueError(f"Error: Model {name} has layers {brain.layers}, served models use {self.networks[0].layers}.")
+
+        self.model_rows[name] = len(self.networks)
+        self.networks.append(brain)
+        self.batch = NetworkBatch(self.networks)
+
+    def load_best_model(self):
+        model_data = self.model_manager.load_best_model()
+        if model_data is None:
+            return False
+        self.add_model("best", model_data)
+        return True
+
+    def load_top_models(self, count):
+        # Registry models are served under their content hash
+        for model_data in self.model_manager.load_top_models(count):
+            self.add_model(model_data['metadata']['hash'], model_data)
+
+    def start(self):
+        """Starts the batching loop on the running event loop"""
+        self.queue = asyncio.Queue()
+        self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def decide(self, inputs, model="best"):
+        """Action index (0 forward, 1 left, 2 right) for one sensor vector"""
+        if self.queue is None:
+            raise RuntimeError("Error: InferenceServer.start() must be called before decide().")
+
+        row = self.model_rows.get(model)
+        if row is None:
+            raise KeyError(f"Error: Model {model} is not loaded.")
+
+        # Checked here so a malformed request only fails its own caller, not the batch it would join
+        try:
+            vector = np.asarray(inputs, dtype=np.float32)
+        except (ValueError, TypeError):
+            raise ValueError(f"Error: Inputs must be numbers, got {inputs!r}.")
+        if vector.shape != (self.batch.layers[0],):
+            raise ValueError(f"Error: Expected {self.batch.layers[0]} inputs, got shape {vector.shape}.")
+
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((row, vector, future))
+        return await future
+
+    def take_requests(self, requests):
+        while len(requests) < self.max_batch_size and not self.queue.empty():
+            requests.append(self.queue.get_nowait())
+
+    async def run(self):
+        while True:
+            requests = [await self.queue.get()]
+            self.take_requests(requests)
+
+            # Give other games max_delay to join the batch, the wait is what bounds the latency
+            if len(requests) < self.max_batch_size:
+                await asyncio.sleep(self.max_delay)
+                self.take_requests(requests)
+
+            requests = [request for request in requests if not request[2].cancelled()]
+            if not requests:
+                continue
+
+            try:
+                rows = np.array([row for row, _, _ in requests])
+                inputs = np.stack([inputs for _, inputs, _ in requests])
+                actions = self.batch.decide(inputs, rows)
+            except Exception as e:
+                # Requests are validated in decide(), an unexpected failure fails the batch but never the loop
+                for _, _, future in requests:
+                    future.set_exception(ValueError(f"Error: Inference failed: {e}"))
+                continue
+
+            for (_, _, future), action in zip(requests, actions):
+                future.set_result(int(action))
+
+    async def handle_client(self, reader, writer):
+        # One JSON request per line: {"inputs": [...], "model": "best"} -> {"action": 1}
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+
+                try:
+                    request = json.loads(line)
+                    action = await self.decide(request['inputs'], request.get('model', "best"))
+                    response = {'action': action}
+                except (ValueError, KeyError, TypeError) as e:
+                    response = {'error': str(e)}
+
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve_unix(self, path=DEFAULT_SOCKET_PATH):
+        if os.path.exists(path):
+            os.remove(path)
+        if self.task is None:
+            self.start()
+        return await asyncio.start_unix_server(self.handle_client, path=path)
+
+
+class InferenceClient:
+    """Connection from one game to an InferenceServer listening on a Unix socket"""
+
+    def __init__(self, model="best"):
+        self.model = model
+        self.reader = None
+        self.writer = None
+
+    async def connect(self, path=DEFAULT_SOCKET_PATH):
+        self.reader, self.writer = await asyncio.open_unix_connection(path)
+
+    async def decide(self, inputs):
+        request = {'inputs': [float(value) for value in inputs], 'model': self.model}
+        self.writer.write(json.dumps(request).encode() + b"\n")
+        await self.writer.drain()
+
+        response = json.loads(await self.reader.readline())
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+        return response['action']
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def serve(socket_path, top, max_batch_size, max_delay):
+    server = InferenceServer(max_batch_size=max_batch_size, max_delay=max_delay)
+    if not server.load_best_model():
+        print("No saved model found.")
+        return
+    if top:
+        server.load_top_models(top)
+
+    unix_server = await server.serve_unix(socket_path)
+    print(f"Serving {len(server.model_rows)} model(s) on {socket_path}")
+    async with unix_server:
+        await unix_server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve batched snake decisions over a Unix socket")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Unix socket path to listen on")
+    parser.add_argument("--top", type=int, default=0, help="also serve the top N registry models by fitness")
+    parser.add_argument("--max-batch", type=int, default=512, help="largest batch per forward pass")
+    parser.add_argument("--max-delay-ms", type=float, default=2.0, help="longest wait for a batch to fill")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.socket, args.top, args.max_batch, args.max_delay_ms / 1000))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
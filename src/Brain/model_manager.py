@@ -1,35 +1,163 @@
 import pickle
 import os
+import json
+import hashlib
 import numpy as np
 from src.constants import *
 from src.Brain.neural_network import NeuralNetwork
 from src.game.ai_snake import AISnake
+from src.game.grid import center_cell
 
 class ModelManager:
+    """
+    Saves brains as flat float64 .npy files named by the hash of their content, under models/registry.
+    index.json keeps each model's layers and stats, so models can be listed, ranked and pruned
+    without opening them, and loading memory-maps the parameters instead of unpickling.
+
+    """
+
     def __init__(self, model_dir=MODEL_DIR):
         self.model_dir = model_dir
-        os.makedirs(model_dir, exist_ok=True)
+        self.registry_dir = os.path.join(model_dir, 'registry')
+        self.index_path = os.path.join(self.registry_dir, 'index.json')
+        os.makedirs(self.registry_dir, exist_ok=True)
     
-    def save_best_model(self, snake):
+    def save_best_model(self, snake, generation=None):
+        # The registry's best pointer follows the latest saved record, like the single best_model.pkl did
+        index = self.read_index()
+        model_hash = self.store_model(index, snake, generation)
+        if model_hash is None:
+            return False
+
+        index['best'] = model_hash
+        return self.write_index(index)
+
+    def save_model(self, snake, generation=None):
+        index = self.read_index()
+        model_hash = self.store_model(index, snake, generation)
+        if model_hash is None or not self.write_index(index):
+            return None
+        return model_hash
+
+    def store_model(self, index, snake, generation=None):
+        # Writes the parameter file and adds its entry to index, the caller writes the index once
         try:
-            model_data = {
-                'brain': {
-                    'layers': snake.brain.layers,
-                    'weights': [w.tolist() for w in snake.brain.weights],
-                    'biases': [b.tolist() for b in snake.brain.biases]
-                }
+            layers = [int(size) for size in snake.brain.layers]
+            parameters = np.ascontiguousarray(snake.brain.get_parameters(), dtype=np.float64)
+
+            # Identical brains share one file
+            digest = hashlib.sha256(json.dumps(layers).encode())
+            digest.update(parameters.tobytes())
+            model_hash = digest.hexdigest()[:16]
+
+            file_name = f"{model_hash}.npy"
+            model_path = os.path.join(self.registry_dir, file_name)
+            if not os.path.exists(model_path):
+                temp_path = model_path + '.tmp'
+                with open(temp_path, 'wb') as f:
+                    np.save(f, parameters)
+                os.replace(temp_path, model_path)
+
+            index['models'][model_hash] = {
+                'file': file_name,
+                'layers': layers,
+                'fitness': round(float(snake.fitness), 2),
+                'generation': generation,
+                'food_eaten': int(snake.food_eaten)
             }
-            pickle_path = os.path.join(self.model_dir, 'best_model.pkl')
-            with open(pickle_path, 'wb') as f:
-                pickle.dump(model_data, f)
-            return True
-            
+            return model_hash
+
         except Exception as e:
             print(f"Error saving model: {e}")
+            return None
+
+    def read_index(self):
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'best': None, 'models': {}}
+
+    def write_index(self, index):
+        try:
+            temp_path = self.index_path + '.tmp'
+            with open(temp_path, 'w') as f:
+                json.dump(index, f, indent=4)
+            os.replace(temp_path, self.index_path)
+            return True
+
+        except Exception as e:
+            print(f"Error saving model index: {e}")
             return False
+
+    def list_models(self, sort_by='fitness', index=None):
+        """Registry entries, best first, read from the index only"""
+        index = index or self.read_index()
+        entries = [dict(entry, hash=model_hash) for model_hash, entry in index['models'].items()]
+        return sorted(entries, key=lambda entry: entry.get(sort_by) or 0, reverse=True)
+
+    def load_model(self, model_hash, mmap=True):
+        entry = self.read_index()['models'].get(model_hash)
+        if entry is None:
+            print(f"Model not found in registry: {model_hash}")
+            return None
+        return self.load_entry(model_hash, entry, mmap)
+
+    def load_entry(self, model_hash, entry, mmap=True):
+        try:
+            # Read-only memory map, the weights and biases below are views into it
+            parameters = np.load(os.path.join(self.registry_dir, entry['file']), mmap_mode='r' if mmap else None)
+
+            weights, biases = [], []
+            offset = 0
+            shapes = NeuralNetwork.parameter_shapes(entry['layers'])
+            for i, (rows, cols) in enumerate(shapes):
+                block = parameters[offset:offset + rows * cols].reshape(rows, cols)
+                (weights if i < len(shapes) // 2 else biases).append(block)
+                offset += rows * cols
+
+            return {
+                'brain': {'layers': entry['layers'], 'weights': weights, 'biases': biases},
+                'metadata': dict(entry, hash=model_hash)
+            }
+
+        except Exception as e:
+            print(f"Error loading model: {e}")
+            return None
+
+    def load_top_models(self, count, sort_by='fitness'):
+        # One index snapshot for the whole load
+        models = [self.load_entry(entry['hash'], entry) for entry in self.list_models(sort_by)[:count]]
+        return [model for model in models if model is not None]
+
+    def prune(self, keep, sort_by='fitness'):
+        """Deletes all but the top keep models, the current best model is always kept"""
+        index = self.read_index()
+        removed = 0
+        for entry in self.list_models(sort_by, index)[keep:]:
+            if entry['hash'] == index['best']:
+                continue
+            try:
+                os.remove(os.path.join(self.registry_dir, entry['file']))
+            except FileNotFoundError:
+                pass
+            del index['models'][entry['hash']]
+            removed += 1
+
+        self.write_index(index)
+        return removed
     
     def load_best_model(self, file_path=None):
         if file_path is None:
+            index = self.read_index()
+            best = index['best']
+            if best is not None:
+                if best not in index['models']:
+                    print(f"Model not found in registry: {best}")
+                    return None
+                return self.load_entry(best, index['models'][best])
+
+            # Nothing in the registry yet, fall back to the pickled model from older versions
             file_path = MODEL_PATH
         
         try:
@@ -58,7 +186,7 @@ class ModelManager:
             )
         
             snake = AISnake(
-                start_pos=(screen_width // 2, screen_height // 2),
+                start_pos=center_cell(screen_width, screen_height, tile_size),
                 tile_size=tile_size,
                 screen_width=screen_width,
                 screen_height=screen_height,
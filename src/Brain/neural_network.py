@@ -3,11 +3,16 @@ import numpy as np
 
 class NeuralNetwork:
     
-    def __init__(self, layers):
+    def __init__(self, layers, parameters=None):
         self.layers = layers
         self.weights = []
         self.biases = []
-        self.initialize_weights_and_biases()
+
+        # parameters is a flat vector (e.g. a row of a genome matrix) the network works on in place
+        if parameters is not None:
+            self.bind_parameters(parameters)
+        else:
+            self.initialize_weights_and_biases()
 
     
     def initialize_weights_and_biases(self):
@@ -37,10 +42,7 @@ class NeuralNetwork:
 
 
     def copy(self):
-        clone = NeuralNetwork(self.layers)
-        clone.weights = [w.copy() for w in self.weights]
-        clone.biases = [b.copy() for b in self.biases]
-        return clone
+        return NeuralNetwork(self.layers, self.get_parameters())
 
 
     def get_total_parameters(self):
@@ -62,8 +64,9 @@ class NeuralNetwork:
         if len(weights) != len(self.weights) or len(biases) != len(self.biases):
             raise ValueError("Error: Loading external weights and biases.")
         
-        self.weights = [w.copy() for w in weights]
-        self.biases = [b.copy() for b in biases]
+        # Copy into the existing arrays, so a network bound to a genome matrix stays a view into it
+        for target, source in zip(self.weights + self.biases, list(weights) + list(biases)):
+            target[...] = source
 
 
     def save_weights(self):
@@ -71,4 +74,113 @@ class NeuralNetwork:
             'weights': [w.copy() for w in self.weights],
             'biases': [b.copy() for b in self.biases],
             'layers': self.layers.copy()
-        }
\ No newline at end of file
+        }
+
+    @staticmethod
+    def parameter_shapes(layers):
+        # Flat parameter order: every weight matrix, then every bias column
+        weights = [(layers[i + 1], layers[i]) for i in range(len(layers) - 1)]
+        biases = [(layers[i + 1], 1) for i in range(len(layers) - 1)]
+        return weights + biases
+
+    def get_parameters(self):
+        return np.concatenate([w.ravel() for w in self.weights] + [b.ravel() for b in self.biases])
+
+    def bind_parameters(self, parameters):
+        """Use slices of a contiguous flat vector as the weights and biases, without copying"""
+        arrays = []
+        offset = 0
+        for shape in self.parameter_shapes(self.layers):
+            size = shape[0] * shape[1]
+            arrays.append(parameters[offset:offset + size].reshape(shape))
+            offset += size
+
+        self.weights = arrays[:len(self.layers) - 1]
+        self.biases = arrays[len(self.layers) - 1:]
+
+class NetworkBatch:
+    """
+    Stacks the weights and biases of many networks with the same layers into 3-D tensors,
+    so a whole population can be evaluated in one call instead of one feedforward per snake.
+
+    """
+
+    def __init__(self, networks, dtype=np.float64):
+        layer_count = len(networks[0].layers) - 1
+        weights = [np.stack([net.weights[i] for net in networks]) for i in range(layer_count)]
+        biases = [np.stack([net.biases[i][:, 0] for net in networks]) for i in range(layer_count)]
+        self.setup(networks[0].layers, weights, biases, dtype)
+
+    @classmethod
+    def from_genomes(cls, layers, genomes, dtype=np.float64):
+        """Builds a batch straight from a (networks, parameters) matrix in NeuralNetwork.get_parameters order"""
+        shapes = NeuralNetwork.parameter_shapes(layers)
+        arrays = []
+        offset = 0
+        for shape in shapes:
+            size = shape[0] * shape[1]
+            arrays.append(genomes[:, offset:offset + size].reshape((len(genomes),) + shape))
+            offset += size
+
+        layer_count = len(layers) - 1
+        batch = cls.__new__(cls)
+        batch.setup(layers, arrays[:layer_count], [b[:, :, 0] for b in arrays[layer_count:]], dtype)
+        return batch
+
+    def setup(self, layers, weights, biases, dtype):
+        self.layers = layers
+        self.size = len(weights[0])
+        self.dtype = dtype
+
+        # weights[i] is (networks, outputs, inputs), biases[i] is (networks, outputs)
+        self.weights = [w.astype(dtype, copy=False) for w in weights]
+        self.biases = [b.astype(dtype, copy=False) for b in biases]
+
+        # Preallocated activations, one buffer per layer
+        self.activations = [np.empty((self.size, size), dtype=dtype) for size in layers[1:]]
+        # Weights and biases gathered for the rows of a call, allocated on the first call with rows
+        self.gathered = None
+
+    def sigmoid(self, x):
+        # In place version of NeuralNetwork.sigmoid
+        np.clip(x, -500, 500, out=x) # Avoid overflow
+        np.negative(x, out=x)
+        with np.errstate(over='ignore'):
+            np.exp(x, out=x)
+        x += 1
+        np.divide(1, x, out=x)
+        return x
+
+    def feedforward(self, x, rows=None):
+        """
+        Runs a batch of inputs, x is (count, inputs) and rows picks the network for every input row.
+        Without rows the whole batch is evaluated in order. The result is a view into a reused buffer.
+
+        """
+        count = len(x)
+        x = x.astype(self.dtype, copy=False)
+
+        # With rows, several inputs can share a network, so a call may need more rows than there are networks
+        if count > len(self.activations[0]):
+            self.activations = [np.empty((count, size), dtype=self.dtype) for size in self.layers[1:]]
+        if rows is not None and (self.gathered is None or count > len(self.gathered[0][0])):
+            self.gathered = [(np.empty((max(count, self.size),) + w.shape[1:], dtype=self.dtype),
+                              np.empty((max(count, self.size),) + b.shape[1:], dtype=self.dtype))
+                             for w, b in zip(self.weights, self.biases)]
+
+        for i, (weight, bias, activation) in enumerate(zip(self.weights, self.biases, self.activations)):
+            if rows is not None:
+                # Gather into the reused buffers, fancy indexing would copy every layer on every call
+                weight_buffer, bias_buffer = self.gathered[i]
+                weight = np.take(weight, rows, axis=0, out=weight_buffer[:count])
+                bias = np.take(bias, rows, axis=0, out=bias_buffer[:count])
+            out = activation[:count]
+            np.einsum('nij,nj->ni', weight, x, out=out)
+            out += bias
+            x = self.sigmoid(out)
+
+        return x
+
+    def decide(self, x, rows=None):
+        """Index of the strongest output for every input row"""
+        return np.argmax(self.feedforward(x, rows), axis=1)
@@ -0,0 +1,87 @@
+"""
+Filename: parallel_evaluation.py
+Description: Spreads the episodes of a generation over a pool of worker processes. The population's
+genomes are published through shared memory, so a task is only a slice of rows and a seed.
+"""
+import os
+import numpy as np
+from multiprocessing import get_context, shared_memory
+from src.Brain.neural_network import NeuralNetwork, NetworkBatch
+from src.game.population_sim import PopulationSimulator
+
+# Set up once per worker process by _init_worker
+_worker = {}
+
+
+def _init_worker(shared_name, shape, layers, screen_width, screen_height, tile_size, max_steps):
+    shared = shared_memory.SharedMemory(name=shared_name)
+    _worker['shared'] = shared
+    _worker['genomes'] = np.ndarray(shape, dtype=np.float64, buffer=shared.buf)
+    _worker['layers'] = layers
+    _worker['board'] = (screen_width, screen_height, tile_size)
+    _worker['max_steps'] = max_steps
+
+
+def _evaluate_rows(start, stop, seed, episodes=1, seeds=None, record_rows=None):
+    np.random.seed(seed)
+
+    # Copy the rows out so the parent can publish the next generation while results travel back
+    genomes = _worker['genomes'][start:stop].copy()
+    network = NetworkBatch.from_genomes(_worker['layers'], genomes)
+    simulator = PopulationSimulator(network, *_worker['board'], max_steps=_worker['max_steps'],
+                                    episodes=episodes, seeds=seeds, record_rows=record_rows)
+    return simulator.run(), simulator.get_recordings()
+
+
+def merge_results(chunks):
+    return {key: np.concatenate([chunk[key] for chunk in chunks]) for key in chunks[0]}
+
+
+class ParallelEvaluator:
+    """Worker pool that plays PopulationSimulator episodes for slices of a shared genome matrix"""
+
+    def __init__(self, layers, screen_width, screen_height, tile_size, max_steps, capacity, workers=None):
+        self.workers = workers or os.cpu_count()
+        self.capacity = capacity
+        self.max_steps = max_steps
+        parameter_count = sum(rows * cols for rows, cols in NeuralNetwork.parameter_shapes(layers))
+
+        self.shared = shared_memory.SharedMemory(create=True, size=capacity * parameter_count * 8)
+        self.genomes = np.ndarray((capacity, parameter_count), dtype=np.float64, buffer=self.shared.buf)
+
+        self.pool = get_context().Pool(
+            self.workers,
+            initializer=_init_worker,
+            initargs=(self.shared.name, self.genomes.shape, layers, screen_width, screen_height, tile_size, max_steps)
+        )
+
+    def evaluate(self, genomes, episodes=1, seeds=None, record_rows=None):
+        """Results of every row, plus an EpisodeRecord per row in record_rows (rows count episodes)"""
+        count = len(genomes)
+        if count > self.capacity:
+            raise ValueError("Error: Population is larger than the shared genome buffer.")
+        self.genomes[:count] = genomes
+
+        # A couple of slices per worker keeps the pool busy when some slices end early
+        bounds = np.linspace(0, count, min(count, self.workers * 2) + 1).astype(int)
+        chunk_seeds = np.random.randint(2**31 - 1, size=len(bounds) - 1)
+        tasks = [(int(start), int(stop), int(seed), episodes, seeds, self.chunk_rows(record_rows, start, stop, episodes))
+                 for start, stop, seed in zip(bounds[:-1], bounds[1:], chunk_seeds)]
+
+        # Slices are in row order, so the recordings come back in the order of sorted record_rows
+        chunks = self.pool.starmap(_evaluate_rows, tasks)
+        recordings = [recording for _, chunk_recordings in chunks for recording in chunk_recordings]
+        return merge_results([results for results, _ in chunks]), recordings
+
+    def chunk_rows(self, record_rows, start, stop, episodes):
+        # Recorded rows of one slice, numbered from the slice's first row
+        if record_rows is None:
+            return None
+        rows = np.asarray(record_rows)
+        return rows[(rows >= start * episodes) & (rows < stop * episodes)] - start * episodes
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+        self.shared.close()
+        self.shared.unlink()
@@ -0,0 +1,224 @@
+"""
+Filename: benchmark.py
+Description: Throughput benchmarks for the simulation, the network and the genetic algorithm operators.
+Runs with fixed seeds, prints JSON and can compare a run against a stored baseline to catch regressions.
+"""
+import io
+import sys
+import time
+import json
+import random
+import argparse
+import platform
+import contextlib
+import numpy as np
+from src.constants import WIDTH, HEIGHT, TILE_SIZE
+from src.Brain.neural_network import NeuralNetwork, NetworkBatch
+from src.Brain.genetic_algorithm import GeneticAlgorithm
+from src.game.ai_snake import AISnake
+from src.game.item import Food
+from src.game.grid import DIRECTION_OFFSETS, center_cell
+
+SEED = 1234
+LAYERS = [4, 6, 3]
+BODY_LENGTHS = [1, 20, 100, 400]
+POPULATION_SIZES = [250, 1000, 2500, 10000]
+QUICK_POPULATION_SIZES = [250, 1000]
+MAX_STEPS = 1000
+
+
+def seed_everything(seed=SEED):
+    np.random.seed(seed)
+    random.seed(seed)
+
+
+def serpentine_body(length, tile_size, screen_width):
+    """Cells of a snake folded along the rows from the top left, head first, plus the direction to the free cell ahead of it"""
+    columns = screen_width // tile_size
+    path = []
+    for i in range(length + 1):
+        row, column = divmod(i, columns)
+        if row % 2:
+            column = columns - 1 - column
+        path.append((column, row))
+
+    head, ahead = path[length - 1], path[length]
+    direction = DIRECTION_OFFSETS.index((ahead[0] - head[0], ahead[1] - head[1]))
+    return path[length - 1::-1], direction
+
+
+def bench_snake_update(length, steps=20000, episode_steps=200):
+    """AISnake.update steps per second with the snake starting at the given body length"""
+    seed_everything()
+    snake = AISnake(center_cell(WIDTH, HEIGHT, TILE_SIZE), TILE_SIZE, WIDTH, HEIGHT)
+    food = Food(WIDTH, HEIGHT, TILE_SIZE, snake.get_free_cells())
+    body, direction = serpentine_body(length, TILE_SIZE, WIDTH)
+
+    done = 0
+    elapsed = 0.0
+    while done < steps:
+        snake.reset()
+        snake.set_body(body)
+        snake.direction = direction
+
+        start = time.perf_counter()
+        while snake.alive and snake.steps < episode_steps and done < steps:
+            snake.update(food)
+            if food.collision(snake.head_pos()):
+                snake.grow()
+                food.reset(snake.free_cells)
+            done += 1
+        elapsed += time.perf_counter() - start
+
+    return done / elapsed
+
+
+def bench_feedforward(calls=20000):
+    """Single-input NeuralNetwork.feedforward latency in microseconds"""
+    seed_everything()
+    network = NeuralNetwork(LAYERS)
+    inputs = np.random.random((calls, LAYERS[0])).astype(np.float32)
+
+    start = time.perf_counter()
+    for x in inputs:
+        network.feedforward(x)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def bench_batch_feedforward(population_size=1000, calls=2000):
+    """NetworkBatch.feedforward throughput in snake decisions per second"""
+    seed_everything()
+    batch = NetworkBatch([NeuralNetwork(LAYERS) for _ in range(population_size)])
+    inputs = np.random.random((population_size, LAYERS[0])).astype(np.float32)
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        batch.feedforward(inputs)
+    return population_size * calls / (time.perf_counter() - start)
+
+
+def create_scored_ga(population_size):
+    seed_everything()
+    ga = GeneticAlgorithm(population_size, LAYERS[0], LAYERS[1], LAYERS[2], WIDTH, HEIGHT, TILE_SIZE)
+    for snake, fitness in zip(ga.population, np.random.random(population_size) * 1000):
+        snake.fitness = float(fitness)
+    return ga
+
+
+def bench_fitness_sharing(population_size):
+    """fitness_sharing wall time in seconds"""
+    ga = create_scored_ga(population_size)
+    start = time.perf_counter()
+    ga.fitness_sharing(ga.population)
+    return time.perf_counter() - start
+
+
+def bench_next_generation(population_size):
+    """create_next_generation wall time in seconds, fitness sharing included"""
+    ga = create_scored_ga(population_size)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        ga.create_next_generation()
+    return time.perf_counter() - start
+
+
+def bench_headless_generations(population_size=250, generations=3):
+    """Full headless generations per second: simulation, final fitness and reproduction"""
+    seed_everything()
+    ga = GeneticAlgorithm(population_size, LAYERS[0], LAYERS[1], LAYERS[2], WIDTH, HEIGHT, TILE_SIZE)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(generations):
+            ga.evaluate_population(MAX_STEPS)
+            ga.create_next_generation()
+    elapsed = time.perf_counter() - start
+    ga.close()
+    return generations / elapsed
+
+
+def run_suite(population_sizes, repeats):
+    # Every entry: value, unit and whether a larger value is an improvement
+    results = {}
+
+    def record(name, benchmark, unit, higher_is_better):
+        # Best of several runs, the seeds are fixed so only timing noise differs between them
+        values = [benchmark() for _ in range(repeats)]
+        value = max(values) if higher_is_better else min(values)
+        results[name] = {"value": round(value, 6), "unit": unit, "higher_is_better": higher_is_better}
+        print(f"{name:<40}{value:>14.4f} {unit}", file=sys.stderr)
+
+    for length in BODY_LENGTHS:
+        record(f"snake_update/length_{length}", lambda: bench_snake_update(length), "steps/s", True)
+
+    record("feedforward/single", bench_feedforward, "us/call", False)
+    record("feedforward/batch_1000", bench_batch_feedforward, "decisions/s", True)
+
+    for size in population_sizes:
+        record(f"fitness_sharing/population_{size}", lambda: bench_fitness_sharing(size), "s", False)
+        record(f"create_next_generation/population_{size}", lambda: bench_next_generation(size), "s", False)
+
+    record("headless/population_250", bench_headless_generations, "generations/s", True)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Names of the benchmarks that got worse than the baseline by more than tolerance"""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+
+        old, new = baseline[name]["value"], result["value"]
+        change = (new - old) / old if old else 0.0
+        worse = -change if result["higher_is_better"] else change
+        status = "REGRESSION" if worse > tolerance else "ok"
+        print(f"{name:<40}{old:>14.4f} -> {new:<14.4f}{change:+8.1%}  {status}", file=sys.stderr)
+
+        if worse > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark simulation, inference and genetic algorithm throughput")
+    parser.add_argument("--quick", action="store_true", help="only use the smaller population sizes")
+    parser.add_argument("--repeats", type=int, default=3, help="runs per benchmark, the best one is reported")
+    parser.add_argument("--output", help="write the results JSON to this file instead of stdout")
+    parser.add_argument("--save-baseline", metavar="PATH", help="store the results as a baseline file")
+    parser.add_argument("--baseline", metavar="PATH", help="compare the results against a baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="allowed slowdown against the baseline before failing, 0.10 is 10%%")
+    args = parser.parse_args()
+
+    results = run_suite(QUICK_POPULATION_SIZES if args.quick else POPULATION_SIZES, args.repeats)
+    report = {
+        "seed": SEED,
+        "repeats": args.repeats,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "benchmarks": results
+    }
+
+    text = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            f.write(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["benchmarks"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"Error: {len(regressions)} benchmark(s) regressed beyond {args.tolerance:.0%}.", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Filename: evaluate.py
+Description: Headless evaluation of saved models. Every model plays the same fixed-seed games with
+PopulationSimulator, spread over all cores, and the score distributions are reported per model and
+as a leaderboard. Common seeds make the comparisons paired: models are ranked on identical games.
+"""
+import os
+import json
+import argparse
+import numpy as np
+from multiprocessing import get_context
+from src.constants import WIDTH, HEIGHT, TILE_SIZE
+from src.Brain.neural_network import NeuralNetwork, NetworkBatch
+from src.Brain.model_manager import ModelManager
+from src.game.population_sim import PopulationSimulator, DEATH_REASONS
+
+SEED = 2024
+MAX_STEPS = 1000
+PERCENTILES = [5, 25, 50, 75, 95]
+
+# Simulator rows per task, bounds the memory of a worker
+ROWS_PER_TASK = 2000
+
+
+def play_games(layers, genomes, seeds, max_steps):
+    """Every genome plays one game per seed, results are (genomes, seeds) arrays"""
+    simulator = PopulationSimulator(NetworkBatch.from_genomes(layers, genomes), WIDTH, HEIGHT, TILE_SIZE,
+                                    max_steps=max_steps, episodes=len(seeds), seeds=seeds)
+    results = simulator.run()
+    shape = (len(genomes), len(seeds))
+    return {
+        'score': results['food_eaten'].reshape(shape),
+        'steps': results['steps'].reshape(shape),
+        'fitness': np.maximum(0, results['fitness'] + results['final_fitness_bonus']).reshape(shape),
+        'death': results['death'].reshape(shape)
+    }
+
+
+def load_models(model_manager, hashes, top):
+    if hashes:
+        models = [model_manager.load_model(model_hash) for model_hash in hashes]
+        models = [model for model in models if model is not None]
+    else:
+        models = model_manager.load_top_models(top)
+
+    # Nothing in the registry, fall back to the pickled best model
+    if not models and not hashes:
+        model_data = model_manager.load_best_model()
+        if model_data is not None:
+            models = [dict(model_data, metadata=dict(model_data.get('metadata', {}), hash="best_model.pkl"))]
+    return models
+
+
+def genome(model_data):
+    brain = NeuralNetwork(model_data['brain']['layers'])
+    brain.load_weights(model_data['brain']['weights'], model_data['brain']['biases'])
+    return brain.get_parameters()
+
+
+def evaluate_models(models, games, seed=SEED, max_steps=MAX_STEPS, workers=0):
+    """Plays games seeded games per model, returns a dict of (models, games) arrays"""
+    seeds = np.random.RandomState(seed).randint(2**31 - 1, size=games)
+
+    # Models of the same shape share a network batch, their games are split into slices
+    groups = {}
+    for i, model_data in enumerate(models):
+        groups.setdefault(tuple(model_data['brain']['layers']), []).append(i)
+
+    tasks = []
+    for layers, members in groups.items():
+        genomes = np.stack([genome(models[i]) for i in members])
+        slice_size = max(1, ROWS_PER_TASK // len(members))
+        if workers != 1:
+            # At least a couple of slices per core, so cores that finish early pick up more
+            slice_size = min(slice_size, -(-games // ((workers or os.cpu_count()) * 2)))
+        for start in range(0, games, slice_size):
+            tasks.append((members, start, (list(layers), genomes, seeds[start:start + slice_size], max_steps)))
+
+    if workers == 1:
+        outcomes = [play_games(*arguments) for _, _, arguments in tasks]
+    else:
+        with get_context().Pool(workers or None) as pool:
+            outcomes = pool.starmap(play_games, [arguments for _, _, arguments in tasks])
+
+    results = {key: np.zeros((len(models), games), dtype=value.dtype) for key, value in outcomes[0].items()}
+    for (members, start, _), outcome in zip(tasks, outcomes):
+        for key, value in outcome.items():
+            results[key][members, start:start + value.shape[1]] = value
+    return results
+
+
+def distribution(values):
+    return {
+        'mean': float(values.mean()),
+        'std': float(values.std()),
+        **{f"p{q}": float(value) for q, value in zip(PERCENTILES, np.percentile(values, PERCENTILES))},
+        'max': float(values.max())
+    }
+
+
+def summarize(models, results):
+    """Per model report, ranked by mean score"""
+    games = results['score'].shape[1]
+    reports = []
+    for i, model_data in enumerate(models):
+        metadata = model_data.get('metadata', {})
+        deaths = np.bincount(results['death'][i], minlength=len(DEATH_REASONS)) / games
+        reports.append({
+            'hash': metadata.get('hash'),
+            'generation': metadata.get('generation'),
+            'games': games,
+            'score': distribution(results['score'][i]),
+            'steps': distribution(results['steps'][i]),
+            'fitness': distribution(results['fitness'][i]),
+            'deaths': {reason or "max steps": float(share) for reason, share in zip(DEATH_REASONS, deaths)},
+            'index': i
+        })
+    reports.sort(key=lambda report: report['score']['mean'], reverse=True)
+
+    # Every model played the leader's games, so the gap is a paired difference with its 95% interval
+    leader = results['score'][reports[0]['index']]
+    for report in reports:
+        difference = results['score'][report.pop('index')] - leader
+        margin = 1.96 * difference.std(ddof=1) / np.sqrt(games) if games > 1 else 0.0
+        report['vs_leader'] = {'mean': float(difference.mean()), 'margin': float(margin)}
+    return reports
+
+
+def print_report(reports):
+    for rank, report in enumerate(reports, 1):
+        score, steps = report['score'], report['steps']
+        print(f"\n#{rank} {report['hash']} (generation {report['generation']}, {report['games']} games)")
+        print("   Score: mean {mean:.2f} ± {std:.2f}, p5 {p5:.0f}, p25 {p25:.0f}, median {p50:.0f}, "
+              "p75 {p75:.0f}, p95 {p95:.0f}, max {max:.0f}".format(**score))
+        print("   Steps: mean {mean:.1f}, p5 {p5:.0f}, median {p50:.0f}, p95 {p95:.0f}".format(**steps))
+        print("   Deaths: " + ", ".join(f"{reason} {share:.1%}" for reason, share in report['deaths'].items() if share))
+
+    print("\nLeaderboard")
+    print(f"{'rank':<6}{'model':<18}{'mean score':>12}{'median':>8}{'mean steps':>12}{'vs leader':>20}")
+    for rank, report in enumerate(reports, 1):
+        gap = report['vs_leader']
+        print(f"{rank:<6}{str(report['hash']):<18}{report['score']['mean']:>12.2f}{report['score']['p50']:>8.0f}"
+              f"{report['steps']['mean']:>12.1f}{gap['mean']:>+12.2f} ± {gap['margin']:<5.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate saved models headless on fixed-seed games")
+    parser.add_argument("models", nargs="*", help="registry hashes to evaluate, the top models by default")
+    parser.add_argument("--top", type=int, default=10, help="how many of the best registry models to evaluate")
+    parser.add_argument("--games", type=int, default=1000, help="games per model")
+    parser.add_argument("--seed", type=int, default=SEED, help="seed the game seeds are drawn from")
+    parser.add_argument("--max-steps", type=int, default=MAX_STEPS, help="steps before a game times out")
+    parser.add_argument("--workers", type=int, default=0, help="worker processes, 0 uses every core")
+    parser.add_argument("--json", metavar="PATH", help="write the full report as JSON to this file")
+    args = parser.parse_args()
+
+    models = load_models(ModelManager(), args.models, args.top)
+    if not models:
+        print("No saved model found.")
+        return
+
+    results = evaluate_models(models, args.games, args.seed, args.max_steps, args.workers)
+    reports = summarize(models, results)
+    print_report(reports)
+
+    if args.json:
+        report = {"seed": args.seed, "games": args.games, "max_steps": args.max_steps, "models": reports}
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"\nReport saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
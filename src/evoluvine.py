@@ -1,22 +1,85 @@
 
 import pygame
+import os
 import sys
+import argparse
 from constants import *
 from src.Brain.model_manager import ModelManager
+from src.Brain.decision_table import DecisionTable, compile_model
 from src.game.item import Food
+from src.game.episode_record import ReplaySnake, load_records
 from src.game.score import Score
 from ui.ambient_orb import AmbientOrb
+from src.ui.assets import load_image
+from src.ui.renderer import DirtyRenderer
 
-def create_snake(model_data):
+def create_snake(model_data, decision_table=None):
     model_manager = ModelManager()
-    return model_manager.create_snake_from_model(model_data, WIDTH, HEIGHT, TILE_SIZE)
+    snake = model_manager.create_snake_from_model(model_data, WIDTH, HEIGHT, TILE_SIZE)
+    snake.decision_table = decision_table
+    return snake
 
-def draw_info(surface, font, fitness, screen_width):
-    text_surface = font.render(f"Fitness: {fitness:.2f}", True, (255, 255, 255))
+def info_sprite(renderer, font, fitness, screen_width):
+    text_surface = renderer.text(font, f"Fitness: {fitness:.2f}")
     text_rect = text_surface.get_rect(topright=(screen_width - 10, 50))
-    surface.blit(text_surface, text_rect)
+    return text_surface, text_rect.topleft
+
+def frame_sprites(renderer, font, orbs, snake, food, score):
+    # Back to front: orbs, snake, food, then the text
+    sprites = [orb.sprite() for orb in orbs]
+    sprites += snake.sprites()
+    sprites.append(food.sprite())
+    sprites.append(score.sprite(WIDTH, font))
+    sprites.append(info_sprite(renderer, font, snake.fitness, WIDTH))
+    return sprites
+
+def best_per_generation(records):
+    best = {}
+    for record in records:
+        if record.generation not in best or record.fitness > best[record.generation].fitness:
+            best[record.generation] = record
+    return [best[generation] for generation in sorted(best)]
+
+def replay(records, clock, renderer, font, orbs):
+    # Plays recorded episodes from their actions, no network is run
+    snake = ReplaySnake(TILE_SIZE)
+    food = Food(WIDTH, HEIGHT, TILE_SIZE)
+    score = Score()
+
+    for record in records:
+        pygame.display.set_caption(f"Evoluvine AI - Generation {record.generation} Replay")
+        snake.fitness = record.fitness
+        score.reset()
+        for step, (body, food_cell) in enumerate(record.frames()):
+            clock.tick(FPS)
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    return
+
+            snake.show(body, step < record.steps or record.death is None)
+            if food_cell is not None and food.position != food_cell:
+                if step > 0:
+                    score.increment()
+                food.position = food_cell
+
+            for orb in orbs:
+                orb.update()
+            food.update()
+            renderer.draw(frame_sprites(renderer, font, orbs, snake, food, score))
+        pygame.time.delay(2000)
 
 def main():
+    parser = argparse.ArgumentParser(description="Watch the best trained snake play")
+    parser.add_argument("--decision-table", nargs="?", const="", metavar="PATH",
+                        help="play from a decision lookup table instead of the network, "
+                             "compiled from the model unless a saved table is given")
+    parser.add_argument("--replay", nargs="?", const=os.path.join(MODEL_DIR, "episodes.bin"), metavar="PATH",
+                        help="replay recorded episodes, the trainer's episode log unless a file is given")
+    parser.add_argument("--generation", type=int,
+                        help="with --replay, play every recorded episode of this generation "
+                             "instead of the best one of each generation")
+    args = parser.parse_args()
+
     pygame.init()
     pygame.font.init()
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
@@ -26,11 +89,22 @@ def main():
     #aesthetics
     icon = pygame.image.load(ICON_PATH)
     pygame.display.set_icon(icon)
-    background = pygame.image.load(BG_PATH)
-    background = pygame.transform.scale(background, (WIDTH, HEIGHT))
+    background = load_image(BG_PATH, (WIDTH, HEIGHT), alpha=False)
     font = pygame.font.SysFont(None, 25)
     orbs = [AmbientOrb(WIDTH, HEIGHT, TILE_SIZE) for _ in range(6)]
 
+    if args.replay is not None:
+        records = load_records(args.replay)
+        if args.generation is None:
+            records = best_per_generation(records)
+        else:
+            records = [record for record in records if record.generation == args.generation]
+        if not records:
+            print("No recorded episodes found.")
+        replay(records, clock, DirtyRenderer(screen, background), font, orbs)
+        pygame.quit()
+        sys.exit()
+
     model_manager = ModelManager()
     model_data = model_manager.load_best_model()
     if not model_data:
@@ -38,9 +112,18 @@ def main():
         pygame.quit()
         sys.exit()
 
-    snake = create_snake(model_data)
-    food = Food(WIDTH, HEIGHT, TILE_SIZE)
+    decision_table = None
+    if args.decision_table is not None:
+        decision_table = DecisionTable.load(args.decision_table) if args.decision_table else compile_model(model_data)
+        if decision_table is None:
+            pygame.quit()
+            sys.exit()
+        print("\n".join(decision_table.describe()))
+
+    snake = create_snake(model_data, decision_table)
+    food = Food(WIDTH, HEIGHT, TILE_SIZE, snake.get_free_cells())
     score = Score()
+    renderer = DirtyRenderer(screen, background)
 
     running = True
     while running:
@@ -55,37 +138,21 @@ def main():
             if food.collision(snake.head_pos()):
                 snake.grow()
                 score.increment()
-                food.reset()
+                food.reset(snake.free_cells)
         else:
-            screen.blit(background, (0, 0))
             for orb in orbs:
                 orb.update()
-                orb.draw(screen)
-            snake.draw(screen)
-            food.draw(screen)
-
-            score.draw(screen, WIDTH, font)
-            draw_info(screen, font, snake.fitness, WIDTH)
-
-            pygame.display.flip()
+            renderer.draw(frame_sprites(renderer, font, orbs, snake, food, score))
             pygame.time.delay(2000)
 
-            snake = create_snake(model_data)
-            food.reset()
+            snake = create_snake(model_data, decision_table)
+            food.reset(snake.get_free_cells())
             score.reset()
 
-        screen.blit(background, (0, 0))
         for orb in orbs:
             orb.update()
-            orb.draw(screen)
-        snake.draw(screen)
         food.update()
-        food.draw(screen)
-
-        score.draw(screen, WIDTH, font)
-        draw_info(screen, font, snake.fitness, WIDTH)
-
-        pygame.display.flip()
+        renderer.draw(frame_sprites(renderer, font, orbs, snake, food, score))
 
     pygame.quit()
     sys.exit()
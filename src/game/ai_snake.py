@@ -1,29 +1,41 @@
-import pygame
-from constants import *
+from src.constants import SNAKE_LIVE_PATH, SNAKE_DEAD_PATH
 from src.Brain.neural_network import NeuralNetwork
+from src.game.free_cells import FreeCellIndex
+from src.game.grid import Board, DIRECTION_OFFSETS, DIRECTION_NAMES, TURNS, START_DIRECTIONS, opposite, to_pixels
 import math
 import numpy as np
 from collections import deque, Counter
 
 class AISnake:
+    """
+    Positions are grid cells (x, y) and directions are codes from grid.py, the board is a padded
+    occupancy array. tile_size is only used to turn cells into pixels when the snake is drawn.
+
+    """
+
     def __init__(self, start_pos, tile_size, screen_width, screen_height, brain=None):
         # Config Attributes
         self.tile_size = tile_size
         self.screen_width = screen_width
         self.screen_height = screen_height
+        self.grid_width = screen_width // tile_size
+        self.grid_height = screen_height // tile_size
         self.initial_pos = start_pos
-        self.body = [start_pos]
+        self.board = Board(self.grid_width, self.grid_height)
+        self.free_cells = None # FreeCellIndex, built by get_free_cells once food is placed around this snake
+        self.set_body([start_pos])
         
         # Randomize start direction
-        initial_directions = [(tile_size, 0), (-tile_size, 0), (0, tile_size), (0, -tile_size)]
-        self.direction = initial_directions[np.random.randint(len(initial_directions))]
+        self.direction = START_DIRECTIONS[np.random.randint(len(START_DIRECTIONS))]
         
         # Snake Status Attributes
         self.grow_next = False
         self.alive = True
+        self.death_reason = None
         
         # Default Brain Value
         self.brain = brain if brain else NeuralNetwork([4, 6, 3])
+        self.decision_table = None # compiled DecisionTable, used instead of the brain when set
 
         # Fitness attributes
         self.fitness = 0.0 # snake fitness to calculate performance
@@ -31,13 +43,14 @@ class AISnake:
         self.steps = 0 # number fo total steps taken
         self.idle_steps = 0 # steps taken without reward
         self.max_idle_steps = 150  # maximum idle steps without penalty
+        self.final_fitness_bonus = None # set when the episode was played by PopulationSimulator
         
         # Distace attributes to evaluate fitness
         self.last_food_distance = float('inf')
         self.distance_improvements = 0
         
         # Maximum possible distance
-        self.max_distance = math.sqrt(screen_width**2 + screen_height**2)
+        self.max_distance = math.sqrt(self.grid_width**2 + self.grid_height**2)
         
         # Exploration tracking
         self.visited_positions = set()
@@ -57,36 +70,33 @@ class AISnake:
         # Circular movement detection
         self.movement_pattern_history = deque(maxlen=16)  # Track movement patterns
         self.last_loop_penalty_step = 0  # Prevent spam penalties
-        
-        # Load snake sprites
-        self.image = pygame.image.load(SNAKE_LIVE_PATH).convert_alpha()
-        self.image = pygame.transform.scale(self.image, (tile_size, tile_size))
+        self.clear_loop_tracking()
 
-        self.death_image = pygame.image.load(SNAKE_DEAD_PATH).convert_alpha()
-        self.death_image = pygame.transform.scale(self.death_image, (tile_size, tile_size))
-
-    def reset(self):
+    def reset(self, direction=None):
         """
-        Reset snake to initial state
+        Reset snake to initial state, direction is drawn at random unless given
         
         """
-        self.body = [self.initial_pos]
+        self.set_body([self.initial_pos])
         
         # Select Random Initial Direction
-        initial_directions = [(self.tile_size, 0), (-self.tile_size, 0), (0, self.tile_size), (0, -self.tile_size)]
-        self.direction = initial_directions[np.random.randint(len(initial_directions))]
+        if direction is None:
+            direction = START_DIRECTIONS[np.random.randint(len(START_DIRECTIONS))]
+        self.direction = direction
         
         # Reset all attributes of fitness
         self.grow_next = False
         self.alive = True
+        self.death_reason = None
         self.fitness = 0.0
+        self.final_fitness_bonus = None
         self.food_eaten = 0
         self.steps = 0
         self.idle_steps = 0
         self.last_food_distance = float('inf')
         self.distance_improvements = 0
-        self.visited_positions = set()
-        self.exploration_bonus_given = set()
+        self.visited_positions.clear()
+        self.exploration_bonus_given.clear()
         self.last_direction_change = 0
         
         # Reset loop prevention tracking
@@ -95,53 +105,70 @@ class AISnake:
         self.recent_directions.clear()
         self.movement_pattern_history.clear()
         self.last_loop_penalty_step = 0
+        self.clear_loop_tracking()
+
+    def clear_loop_tracking(self):
+        """
+        Running state behind the loop detectors, updated once per step instead of rescanning the histories
+
+        """
+        # Trailing moves equal to the move 2, 3 and 4 steps earlier
+        self.cycle_matches = {2: 0, 3: 0, 4: 0}
+
+        # Opposite neighbours inside recent_directions and the length of the current same-direction run
+        self.opposite_pairs = 0
+        self.direction_streak = 0
+
+        # Monotonic (index, value) windows over recent_positions for the bounding box, max stored negated
+        self.positions_seen = 0
+        self.min_x_window = deque()
+        self.max_x_window = deque()
+        self.min_y_window = deque()
+        self.max_y_window = deque()
+
+        # position_counts holds visits stamped on top of count_epoch, each food eaten raises the epoch by one
+        self.count_epoch = 0
+
+    def set_body(self, segments):
+        # Body cells head first, the board mirrors them for O(1) collision checks
+        self.body = deque(segments)
+        self.board.clear()
+        for cell in self.body:
+            self.board.cells[self.board.index(cell)] = 1
+        self.head_index = self.board.index(self.body[0])
+        if self.free_cells is not None:
+            self.free_cells.reset(self.body)
+
+    def get_free_cells(self):
+        # Built on first use, snakes evaluated by PopulationSimulator never need one
+        if self.free_cells is None:
+            self.free_cells = FreeCellIndex(self.grid_width, self.grid_height)
+            self.free_cells.reset(self.body)
+        return self.free_cells
 
     def head_pos(self):
         return self.body[0]
 
     def get_relative_directions(self):
-        dx, dy = self.direction
-        # [forward, left, right]
-        return [
-            (dx, dy),           # forward
-            (dy, -dx),          # left 
-            (-dy, dx)           # right 
-        ]
-
+        # [forward, left, right] direction codes
+        return TURNS[self.direction]
 
     def check_danger_in_direction(self, direction):
-        head = self.head_pos()
-        next_pos = (head[0] + direction[0], head[1] + direction[1])
-        
-        # Check walls
-        if (next_pos[0] < 0 or next_pos[0] >= self.screen_width or
-            next_pos[1] < 0 or next_pos[1] >= self.screen_height):
-            return True
-        
-        # Check self collision
-        if next_pos in self.body:
-            return True
-        
-        return False
+        # Walls are occupied board cells too
+        return self.board.cells[self.head_index + self.board.offsets[direction]] != 0
 
     def get_food_angle(self, food_pos):
         head = self.head_pos()
-        
-        # Current direction vector (normalized)
-        curr_dir = np.array(self.direction, dtype=float)
-        curr_dir = curr_dir / np.linalg.norm(curr_dir)
-        
-        # Food direction vector
-        food_vec = np.array([food_pos[0] - head[0], food_pos[1] - head[1]], dtype=float)
-        # return 0, if collision
-        if np.linalg.norm(food_vec) == 0:
+        dx, dy = DIRECTION_OFFSETS[self.direction]
+
+        # Food direction vector, 0 if the head is on the food
+        food_x, food_y = food_pos[0] - head[0], food_pos[1] - head[1]
+        norm = math.sqrt(food_x * food_x + food_y * food_y)
+        if norm == 0:
             return 0.0
-        # Normalize food vector
-        food_vec = food_vec / np.linalg.norm(food_vec)
 
-        # Calculate sine of angle
-        sin_angle = curr_dir[0] * food_vec[1] - curr_dir[1] * food_vec[0]
-        return sin_angle
+        # Sine of the angle between the heading and the food
+        return dx * (food_y / norm) - dy * (food_x / norm)
 
     def get_sensor_inputs(self, food):
         directions = self.get_relative_directions()
@@ -160,19 +187,12 @@ class AISnake:
         if len(self.movement_pattern_history) < 8:
             return False
         
-        # Convert recent movements to a pattern string
-        pattern = list(self.movement_pattern_history)
-        pattern_len = len(pattern)
-        
         # check for repeatign patterns:
         # line, triangle and rectangular patterns
+        # The last two cycles are equal once the last cycle_len moves each match the move one cycle earlier
         for cycle_len in [2, 3, 4]:
-            if pattern_len >= cycle_len * 2:
-                first_cycle = pattern[-cycle_len*2:-cycle_len]
-                second_cycle = pattern[-cycle_len:]
-                
-                if first_cycle == second_cycle:
-                    return True
+            if self.cycle_matches[cycle_len] >= cycle_len:
+                return True
         
         return False
 
@@ -180,17 +200,28 @@ class AISnake:
         if len(self.recent_directions) < 6:
             return False
         
-        directions = list(self.recent_directions)
-        
-        opposite_pairs = 0
-        for i in range(len(directions) - 1):
-            curr_dir = directions[i]
-            next_dir = directions[i + 1]
-            
-            if (curr_dir[0] == -next_dir[0] and curr_dir[1] == -next_dir[1]):
-                opposite_pairs += 1
-        
-        return opposite_pairs >= 3
+        return self.opposite_pairs >= 3
+
+    def is_opposite(self, direction, other):
+        return direction == opposite(other)
+
+    def position_count(self, pos):
+        # Visits to pos, less one for every food eaten since, never below 0
+        return max(0, self.position_counts.get(pos, 0) - self.count_epoch)
+
+    def effective_position_counts(self):
+        return {pos: max(0, count - self.count_epoch) for pos, count in self.position_counts.items()}
+
+    def push_window(self, window, index, value):
+        # Values stay increasing from the front, so the front is the minimum of the window
+        while window and window[-1][1] >= value:
+            window.pop()
+        window.append((index, value))
+
+    def window_front(self, window, start):
+        while window[0][0] < start:
+            window.popleft()
+        return window[0][1]
 
     def calculate_repetition_penalty(self):
         penalty = 0.0
@@ -198,15 +229,17 @@ class AISnake:
             return penalty
 
         current_pos = self.head_pos()
-        position_visits = self.position_counts.get(current_pos, 0)
+        position_visits = self.position_count(current_pos)
         
         # Position revisit penalty
         if position_visits >= self.loop_penalty_threshold:
             penalty += (position_visits - self.loop_penalty_threshold + 1) ** 2 * 2.0
         
         # Same direction penalty
+        # The last threshold directions form one run and match the oldest direction kept
         if len(self.recent_directions) >= self.direction_repetition_threshold:
-            if all(d == list(self.recent_directions)[0] for d in list(self.recent_directions)[-self.direction_repetition_threshold:]):
+            if (min(self.direction_streak, len(self.recent_directions)) >= self.direction_repetition_threshold and
+                    self.recent_directions[-1] == self.recent_directions[0]):
                 penalty += 8.0
         
         # Pattern penalties
@@ -220,11 +253,11 @@ class AISnake:
         
         # Bounded Exploration Penatly:
         if len(self.recent_positions) >= 15:
-            positions = list(self.recent_positions)
-            x_range = max(pos[0] for pos in positions) - min(pos[0] for pos in positions)
-            y_range = max(pos[1] for pos in positions) - min(pos[1] for pos in positions)
+            start = self.positions_seen - len(self.recent_positions)
+            x_range = -self.window_front(self.max_x_window, start) - self.window_front(self.min_x_window, start)
+            y_range = -self.window_front(self.max_y_window, start) - self.window_front(self.min_y_window, start)
             
-            if x_range <= self.tile_size * 4 and y_range <= self.tile_size * 4:
+            if x_range <= 4 and y_range <= 4:
                 penalty += 5.0
         
         # Kill if stuck in a loop
@@ -235,14 +268,19 @@ class AISnake:
         
         return penalty
 
-    def make_decision(self, inputs):
+    def make_decision(self, inputs, output=None):
         if not self.alive:
             return
         
         old_direction = self.direction
         
-        output = self.brain.feedforward(inputs)
-        action = np.argmax(output)
+        # output is passed in when the brain was already run as part of a NetworkBatch
+        if output is not None:
+            action = np.argmax(output)
+        elif self.decision_table is not None:
+            action = self.decision_table.decide(inputs)
+        else:
+            action = np.argmax(self.brain.feedforward(inputs))
         
         directions = self.get_relative_directions()
         chosen_direction = directions[action]
@@ -253,50 +291,56 @@ class AISnake:
             self.last_direction_change = self.steps
         
         # Update patterns for loop detection
-        movement_code = self.direction_to_code(chosen_direction)
-        self.movement_pattern_history.append(movement_code)
-        self.recent_directions.append(chosen_direction)
-
-    def direction_to_code(self, direction):
-        dx, dy = direction
-        if dx > 0:
-            return 'R'  # Right
-        elif dx < 0:
-            return 'L'  # Left
-        elif dy > 0:
-            return 'D'  # Down
-        else:
-            return 'U'  # Up
+        history = self.movement_pattern_history
+        for cycle_len in self.cycle_matches:
+            matched = len(history) >= cycle_len and history[-cycle_len] == chosen_direction
+            self.cycle_matches[cycle_len] = self.cycle_matches[cycle_len] + 1 if matched else 0
+        history.append(chosen_direction)
+
+        directions = self.recent_directions
+        if len(directions) == directions.maxlen and self.is_opposite(directions[0], directions[1]):
+            self.opposite_pairs -= 1
+        if directions and self.is_opposite(directions[-1], chosen_direction):
+            self.opposite_pairs += 1
+        self.direction_streak = self.direction_streak + 1 if directions and directions[-1] == chosen_direction else 1
+        directions.append(chosen_direction)
 
     def move(self):
         if not self.alive:
             return
         
         # Calculate new head position
-        new_head = (self.body[0][0] + self.direction[0],
-                    self.body[0][1] + self.direction[1])
-        
-        # Check wall collision
-        if (new_head[0] < 0 or new_head[0] >= self.screen_width or
-            new_head[1] < 0 or new_head[1] >= self.screen_height):
-            self.die("wall collision")
-            return
-        
-        # Check self collision
-        if new_head in self.body:
-            self.die("self collision")
+        dx, dy = DIRECTION_OFFSETS[self.direction]
+        new_head = (self.body[0][0] + dx, self.body[0][1] + dy)
+        new_index = self.head_index + self.board.offsets[self.direction]
+
+        # Check wall and self collision, the tail still counts since it only moves after the head
+        if self.board.cells[new_index]:
+            self.die("wall collision" if self.board.walls[new_index] else "self collision")
             return
         
         # Update position for loop detection
         self.recent_positions.append(new_head)
-        self.position_counts[new_head] += 1
+        self.push_window(self.min_x_window, self.positions_seen, new_head[0])
+        self.push_window(self.max_x_window, self.positions_seen, -new_head[0])
+        self.push_window(self.min_y_window, self.positions_seen, new_head[1])
+        self.push_window(self.max_y_window, self.positions_seen, -new_head[1])
+        self.positions_seen += 1
+        self.position_counts[new_head] = max(self.position_counts[new_head], self.count_epoch) + 1
         
         # Move snake
-        self.body.insert(0, new_head)
+        self.body.appendleft(new_head)
+        self.board.cells[new_index] = 1
+        self.head_index = new_index
+        if self.free_cells is not None:
+            self.free_cells.occupy(new_head)
         if self.grow_next:
             self.grow_next = False
         else:
-            self.body.pop()
+            tail = self.body.pop()
+            self.board.cells[self.board.index(tail)] = 0
+            if self.free_cells is not None:
+                self.free_cells.release(tail)
         
         self.steps += 1
 
@@ -306,17 +350,15 @@ class AISnake:
         self.idle_steps = 0  # Reset idle steps counter
         
         # Clear old loop detection history when food is eaten
-        if len(self.recent_positions) > 10:
-            positions_to_keep = list(self.recent_positions)[-10:]
-            self.recent_positions.clear()
-            self.recent_positions.extend(positions_to_keep)
+        while len(self.recent_positions) > 10:
+            self.recent_positions.popleft()
         
         # Decrease position counts after successful food collection
-        for pos in list(self.position_counts.keys()):
-            self.position_counts[pos] = max(0, self.position_counts[pos] - 1)
+        self.count_epoch += 1
 
     def die(self, reason="unknown"):
         self.alive = False
+        self.death_reason = reason
 
     def calculate_distance_to_food(self, food_pos):
         head = self.head_pos()
@@ -335,11 +377,10 @@ class AISnake:
         
         #if closer
         if distance_change > 0:  
-            normalized_change = distance_change / self.tile_size
-            reward = normalized_change * 8.0 
+            reward = distance_change * 8.0 
             return reward
         elif distance_change < 0:  # if farther
-            normalized_change = abs(distance_change) / self.tile_size
+            normalized_change = abs(distance_change)
             penalty = -normalized_change * 1.5  # Less penality if movign away
             return penalty
         else:  
@@ -358,7 +399,7 @@ class AISnake:
         
         # Exploration bonus
         current_pos = self.head_pos()
-        exploration_zone = (current_pos[0] // (self.tile_size * 3), current_pos[1] // (self.tile_size * 3))
+        exploration_zone = (current_pos[0] // 3, current_pos[1] // 3)
         if exploration_zone not in self.exploration_bonus_given:
             self.fitness += 5.0
             self.exploration_bonus_given.add(exploration_zone)
@@ -366,8 +407,8 @@ class AISnake:
         # Direction change bonus
         if (self.steps > 10 and (self.steps - self.last_direction_change) < 3 and 
             len(self.recent_directions) >= 3):
-            recent_dirs = list(self.recent_directions)[-3:]
-            if not all(d == recent_dirs[0] for d in recent_dirs):
+            # The last 3 directions are not all the same
+            if self.direction_streak < 3:
                 self.fitness += 1.0
         
         # Update tracking variables
@@ -389,6 +430,11 @@ class AISnake:
             self.die("idle timeout")
 
     def evaluate_final_fitness(self):
+        # Episodes played by PopulationSimulator hand over the bonus they computed
+        if self.final_fitness_bonus is not None:
+            self.fitness = max(0, self.fitness + self.final_fitness_bonus)
+            return self.fitness
+
         # Large food bonus
         food_bonus = self.food_eaten * 100
         
@@ -405,7 +451,7 @@ class AISnake:
         death_penalty = 0 if self.alive else -25
         
         # Loop penalty
-        total_revisits = sum(max(0, count - 1) for count in self.position_counts.values())
+        total_revisits = sum(max(0, count - 1) for count in self.effective_position_counts().values())
         loop_penalty = total_revisits * 0.5  # extra visit
         
         # Total Fitness Calculation
@@ -428,20 +474,25 @@ class AISnake:
         self.move()
         self.update_fitness(food)
 
+    def sprites(self):
+        # Sprites come from the shared asset cache, pygame is only needed once a snake is drawn
+        from src.ui.assets import load_sprite
+
+        image = load_sprite(SNAKE_LIVE_PATH if self.alive else SNAKE_DEAD_PATH, self.tile_size)
+        return [(image, to_pixels(segment, self.tile_size)) for segment in self.body]
+
     def draw(self, surface):
-        for i, segment in enumerate(self.body):
-            if self.alive:
-                surface.blit(self.image, segment)
-            else:
-                surface.blit(self.death_image, segment)
+        for image, segment in self.sprites():
+            surface.blit(image, segment)
 
     def get_loop_stats(self):
         """Get statistics for debugging"""
+        position_counts = self.effective_position_counts()
         return {
-            'position_revisits': dict(self.position_counts),
-            'max_revisits': max(self.position_counts.values()) if self.position_counts else 0,
+            'position_revisits': position_counts,
+            'max_revisits': max(position_counts.values()) if position_counts else 0,
             'unique_positions': len(self.position_counts),
-            'recent_pattern': ''.join(list(self.movement_pattern_history)[-8:]) if self.movement_pattern_history else '',
+            'recent_pattern': ''.join(DIRECTION_NAMES[d] for d in list(self.movement_pattern_history)[-8:]),
             'circular_detected': self.detect_circular_pattern(),
             'back_forth_detected': self.detect_back_and_forth()
-        }
\ No newline at end of file
+        }
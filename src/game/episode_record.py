@@ -0,0 +1,167 @@
+# src/game/episode_record.py
+import zlib
+import struct
+import numpy as np
+from src.game.grid import DIRECTION_OFFSETS, TURNS, to_pixels
+
+DEATH_REASONS = [None, "wall collision", "self collision", "stuck in loop", "idle timeout"]
+
+# seed, generation, snake, fitness, start x, start y, start direction, death, steps, actions, food count
+HEADER = struct.Struct("<iIIfhhBBIIH")
+
+# Every record in a log is framed by a magic word, its length and a CRC32 of it,
+# so a write torn by a crash is found instead of shifting every record after it
+MAGIC = b"EVEP"
+FRAME = struct.Struct("<4sII")
+
+
+def pack_actions(actions):
+    """Four 2-bit actions per byte, the first action in the lowest bits"""
+    actions = np.asarray(actions, dtype=np.uint8)
+    padded = np.zeros(-(-len(actions) // 4) * 4, dtype=np.uint8)
+    padded[:len(actions)] = actions
+    quads = padded.reshape(-1, 4)
+    return (quads[:, 0] | quads[:, 1] << 2 | quads[:, 2] << 4 | quads[:, 3] << 6).tobytes()
+
+
+def unpack_actions(data, count):
+    packed = np.frombuffer(data, dtype=np.uint8)
+    return (packed[:, None] >> np.array([0, 2, 4, 6], dtype=np.uint8) & 3).ravel()[:count]
+
+
+class EpisodeRecord:
+    """
+    One episode in grid cells: the start cell and direction, the action (0 forward, 1 left, 2 right) of every
+    decision, every food position in spawn order and how the episode ended. The moves follow from the
+    actions, so an episode is replayed without its network. seed is the episode seed, -1 when unseeded.
+
+    """
+
+    def __init__(self, start, direction, actions, foods, steps, death, seed=-1, generation=0, snake=0, fitness=0.0):
+        self.start = tuple(start)
+        self.direction = int(direction)
+        self.actions = np.asarray(actions, dtype=np.uint8)
+        self.foods = [tuple(food) for food in foods]
+        self.steps = int(steps)
+        self.death = death
+        self.seed = int(seed)
+        self.generation = generation
+        self.snake = snake
+        self.fitness = fitness
+
+    def frames(self):
+        """Yields (body, food) after every step, from the start to the end, body head first in grid cells"""
+        body = [self.start]
+        direction = self.direction
+        foods = iter(self.foods)
+        food = next(foods, None)
+        grow = False
+        yield body, food
+
+        # A collision is the last decision, it doesn't move the snake
+        for action in self.actions[:self.steps].tolist():
+            direction = TURNS[direction][action]
+            dx, dy = DIRECTION_OFFSETS[direction]
+            body = [(body[0][0] + dx, body[0][1] + dy)] + (body if grow else body[:-1])
+            grow = body[0] == food
+            if grow:
+                food = next(foods, None)
+            yield body, food
+
+    def to_bytes(self):
+        header = HEADER.pack(self.seed, self.generation, self.snake, self.fitness, self.start[0], self.start[1],
+                             self.direction, DEATH_REASONS.index(self.death), self.steps, len(self.actions),
+                             len(self.foods))
+        foods = np.array(self.foods, dtype=np.int16).reshape(-1, 2)
+        return header + pack_actions(self.actions) + foods.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data, offset=0):
+        """The record at offset and the offset just past it"""
+        (seed, generation, snake, fitness, x, y, direction, death, steps,
+         count, food_count) = HEADER.unpack_from(data, offset)
+        offset += HEADER.size
+        actions = unpack_actions(data[offset:offset + -(-count // 4)], count)
+        offset += -(-count // 4)
+        foods = np.frombuffer(data[offset:offset + food_count * 4], dtype=np.int16).reshape(-1, 2).tolist()
+        offset += food_count * 4
+        record = cls((x, y), direction, actions, foods, steps, DEATH_REASONS[death], seed, generation, snake, fitness)
+        return record, offset
+
+
+def append_records(path, records):
+    try:
+        with open(path, "ab") as f:
+            for record in records:
+                data = record.to_bytes()
+                f.write(FRAME.pack(MAGIC, len(data), zlib.crc32(data)) + data)
+        return True
+    except Exception as e:
+        print(f"Error saving episode records: {e}")
+        return False
+
+
+def read_records(data):
+    """Yields (record, offset just past it) for every intact record, up to the first damaged or incomplete one"""
+    offset = 0
+    while offset + FRAME.size <= len(data):
+        magic, length, checksum = FRAME.unpack_from(data, offset)
+        start = offset + FRAME.size
+        payload = data[start:start + length]
+        if magic != MAGIC or len(payload) != length or zlib.crc32(payload) != checksum:
+            return
+        offset = start + length
+        yield EpisodeRecord.from_bytes(payload)[0], offset
+
+
+def load_records(path):
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except Exception as e:
+        print(f"Error loading episode records: {e}")
+        return []
+
+    records, end = [], 0
+    for record, end in read_records(data):
+        records.append(record)
+    if end < len(data):
+        print(f"Error: {path} is damaged after {len(records)} records, the remaining {len(data) - end} bytes are skipped.")
+    return records
+
+
+def truncate_records(path, generation):
+    """Cuts a log back to its last intact record of at most generation, so a resumed run appends after it"""
+    try:
+        with open(path, "r+b") as f:
+            end = 0
+            for record, offset in read_records(f.read()):
+                if record.generation > generation:
+                    break
+                end = offset
+            f.truncate(end)
+        return True
+    except Exception as e:
+        print(f"Error truncating episode records: {e}")
+        return False
+
+
+class ReplaySnake:
+    """Draws the body of a replayed frame like an AISnake, grid cells become pixels here"""
+
+    def __init__(self, tile_size):
+        self.tile_size = tile_size
+        self.body = []
+        self.alive = True
+        self.fitness = 0.0
+
+    def show(self, body, alive=True):
+        self.body = [to_pixels(cell, self.tile_size) for cell in body]
+        self.alive = alive
+
+    def sprites(self):
+        from src.constants import SNAKE_LIVE_PATH, SNAKE_DEAD_PATH
+        from src.ui.assets import load_sprite
+
+        image = load_sprite(SNAKE_LIVE_PATH if self.alive else SNAKE_DEAD_PATH, self.tile_size)
+        return [(image, segment) for segment in self.body]
@@ -0,0 +1,50 @@
+# src/game/free_cells.py
+import random
+
+
+class FreeCellIndex:
+    """
+    The cells food can spawn on (one tile in from the walls, like Item.random_position) that the snake
+    doesn't cover, as grid cells. cells[:count] are the free ones and slots maps every cell to its
+    place in cells, so taking or freeing a cell is a swap with the end of the free part.
+
+    """
+
+    def __init__(self, grid_width, grid_height, margin=1):
+        self.cells = [(x, y) for y in range(margin, grid_height - margin) for x in range(margin, grid_width - margin)]
+        self.slots = {cell: i for i, cell in enumerate(self.cells)}
+        self.count = len(self.cells)
+
+    def swap(self, i, j):
+        cells, slots = self.cells, self.slots
+        cells[i], cells[j] = cells[j], cells[i]
+        slots[cells[i]] = i
+        slots[cells[j]] = j
+
+    def occupy(self, cell):
+        i = self.slots.get(cell)
+        if i is not None and i < self.count:
+            self.count -= 1
+            self.swap(i, self.count)
+
+    def release(self, cell):
+        i = self.slots.get(cell)
+        if i is not None and i >= self.count:
+            self.swap(i, self.count)
+            self.count += 1
+
+    def reset(self, body):
+        # Freeing everything is just the count, the order of the cells doesn't matter
+        self.count = len(self.cells)
+        for cell in body:
+            self.occupy(cell)
+
+    def is_free(self, cell):
+        i = self.slots.get(cell)
+        return i is not None and i < self.count
+
+    def sample(self):
+        """Uniformly random free cell, None once the snake covers them all"""
+        if self.count == 0:
+            return None
+        return self.cells[random.randrange(self.count)]
@@ -0,0 +1,53 @@
+# src/game/grid.py
+# The game logic works on integer grid cells (x, y) and direction codes, pixels only exist when drawing.
+
+# Direction codes go clockwise: right, down, left, up
+RIGHT, DOWN, LEFT, UP = 0, 1, 2, 3
+DIRECTION_OFFSETS = [(1, 0), (0, 1), (-1, 0), (0, -1)]
+DIRECTION_NAMES = "RDLU"
+
+# [forward, left, right] direction codes for every current direction
+TURNS = [[d, (d + 3) % 4, (d + 1) % 4] for d in range(4)]
+
+# AISnake picks its start direction from right, left, down, up
+START_DIRECTIONS = [RIGHT, LEFT, DOWN, UP]
+
+
+def opposite(direction):
+    return (direction + 2) % 4
+
+
+def to_pixels(cell, tile_size):
+    return (cell[0] * tile_size, cell[1] * tile_size)
+
+
+def center_cell(screen_width, screen_height, tile_size):
+    # The cell under the middle of the screen, where snakes start
+    return ((screen_width // 2) // tile_size, (screen_height // 2) // tile_size)
+
+
+class Board:
+    """
+    Occupancy of a grid padded with a one cell wall border, as a flat bytearray. Cell (x, y) is at
+    (y + 1) * stride + x + 1, so a neighbour is one offset away and walls need no bounds checks.
+
+    """
+
+    def __init__(self, grid_width, grid_height):
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.stride = grid_width + 2
+        self.offsets = [dx + dy * self.stride for dx, dy in DIRECTION_OFFSETS]
+
+        self.walls = bytearray(self.stride * (grid_height + 2))
+        for x in range(self.stride):
+            self.walls[x] = self.walls[-1 - x] = 1
+        for y in range(1, grid_height + 1):
+            self.walls[y * self.stride] = self.walls[y * self.stride + self.stride - 1] = 1
+        self.cells = bytearray(self.walls)
+
+    def index(self, cell):
+        return (cell[1] + 1) * self.stride + cell[0] + 1
+
+    def clear(self):
+        self.cells[:] = self.walls
@@ -0,0 +1,467 @@
+# src/game/population_sim.py
+import math
+import numpy as np
+from src.Brain.neural_network import NetworkBatch
+from src.game.episode_record import EpisodeRecord, DEATH_REASONS
+from src.game import grid
+
+# The direction tables of grid.py as arrays
+DIRECTION_OFFSETS = np.array(grid.DIRECTION_OFFSETS)
+START_DIRECTIONS = np.array(grid.START_DIRECTIONS)
+TURNS = np.array(grid.TURNS)
+
+# Death codes, indexes of DEATH_REASONS (the reasons AISnake passes to die())
+WALL_COLLISION, SELF_COLLISION, STUCK_IN_LOOP, IDLE_TIMEOUT = 1, 2, 3, 4
+
+# AISnake loop detection settings
+MAX_IDLE_STEPS = 150
+LOOP_PENALTY_THRESHOLD = 5
+MAX_POSITION_REVISITS = 8
+RECENT_POSITIONS = 20
+PATTERN_WINDOW = 8
+
+
+class PopulationSimulator:
+    """
+    Plays one episode for every brain (a list of NeuralNetworks or a NetworkBatch) in lockstep, one tick for the whole population at a time.
+    Follows the sensor, move, fitness and death rules of AISnake.update plus the trainer's food handling.
+
+    With episodes > 1 every brain plays that many episodes in the same batch, rows are brain-major
+    (brain i owns rows i * episodes to i * episodes + episodes - 1). Given seeds, one per episode,
+    episode k of every brain gets the same start direction and food sequence (common random numbers).
+
+    The board is stored per snake as flat arrays over a grid padded with a one cell wall border,
+    so danger and collision checks are a single lookup.
+
+    """
+
+    def __init__(self, brains, screen_width, screen_height, tile_size, max_steps=1000, dtype=np.float64,
+                 episodes=1, seeds=None, record_rows=None):
+        self.tile_size = tile_size
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.grid_width = screen_width // tile_size
+        self.grid_height = screen_height // tile_size
+        self.max_steps = max_steps
+        self.max_distance = math.sqrt(self.grid_width**2 + self.grid_height**2)
+        self.start_cell = grid.center_cell(screen_width, screen_height, tile_size)
+
+        # Padded board layout, the border cells are the walls
+        self.row_stride = self.grid_width + 2
+        board_size = self.row_stride * (self.grid_height + 2)
+        self.cell_offsets = np.array([1, self.row_stride, -1, -self.row_stride])
+        cell_x = np.arange(board_size) % self.row_stride - 1
+        cell_y = np.arange(board_size) // self.row_stride - 1
+        self.walls = (cell_x < 0) | (cell_x >= self.grid_width) | (cell_y < 0) | (cell_y >= self.grid_height)
+        zone_width = (self.grid_width + 2) // 3
+        self.cell_zone = np.where(self.walls, 0, (cell_y // 3) * zone_width + cell_x // 3)
+        self.zone_count = zone_width * ((self.grid_height + 2) // 3)
+        self.board_size = board_size
+
+        # Cells food can spawn on, one tile in from the walls like Item.random_position
+        inside = (cell_x >= 1) & (cell_x < self.grid_width - 1) & (cell_y >= 1) & (cell_y < self.grid_height - 1)
+        self.spawn_cells = np.flatnonzero(inside)
+
+        # Stack every brain so the population decides in one batched forward pass
+        self.network = brains if isinstance(brains, NetworkBatch) else NetworkBatch(brains, dtype=dtype)
+
+        self.episodes = episodes
+        self.size = self.network.size * episodes
+        self.brain_rows = np.repeat(np.arange(self.network.size), episodes) if episodes > 1 else None
+        self.row_episode = np.arange(self.size) % episodes
+        self.body_capacity = min(self.grid_width * self.grid_height, max_steps + 1)
+        self.record_rows = None if record_rows is None else np.asarray(record_rows, dtype=np.int64)
+        self.seeds = seeds
+
+        # Seeded episodes draw their start direction and food draws from tables, a snake eats at most one food per tick
+        self.start_table = None
+        self.food_table = None
+        if seeds is not None:
+            if len(seeds) != episodes:
+                raise ValueError("Error: Need exactly one seed per episode.")
+            self.start_table = np.empty(episodes, dtype=np.int64)
+            self.food_table = np.empty((episodes, max_steps + 1))
+            for k, seed in enumerate(seeds):
+                rng = np.random.RandomState(seed)
+                self.start_table[k] = rng.randint(4)
+                self.food_table[k] = rng.random_sample(max_steps + 1)
+
+        self.reset()
+
+    def to_cell(self, x, y):
+        return (y + 1) * self.row_stride + (x + 1)
+
+    def reset(self):
+        n = self.size
+        start = self.to_cell(*self.start_cell)
+
+        self.tick = 0
+        self.alive = np.ones(n, dtype=bool)
+        self.death = np.zeros(n, dtype=np.int8)
+        if self.start_table is None:
+            self.direction = START_DIRECTIONS[np.random.randint(4, size=n)]
+        else:
+            self.direction = START_DIRECTIONS[self.start_table[self.row_episode]]
+
+        # Body ring buffer of cells, head_index points at the head slot
+        self.head = np.tile(np.array(self.start_cell), (n, 1))
+        self.head_cell = np.full(n, start)
+        self.body = np.zeros((n, self.body_capacity), dtype=np.int32)
+        self.body[:, 0] = start
+        self.head_index = np.zeros(n, dtype=np.int64)
+        self.length = np.ones(n, dtype=np.int64)
+        self.grow_next = np.zeros(n, dtype=bool)
+
+        # Walls count as occupied so danger sensing needs no bounds checks
+        self.occupied = np.tile(self.walls, (n, 1))
+        self.occupied[:, start] = True
+        self.position_counts = np.zeros((n, self.board_size), dtype=np.int16)
+        self.zones_visited = np.zeros((n, self.zone_count), dtype=bool)
+
+        # Fitness attributes
+        self.fitness = np.zeros(n)
+        self.food_eaten = np.zeros(n, dtype=np.int64)
+        self.steps = np.zeros(n, dtype=np.int64)
+        self.idle_steps = np.zeros(n, dtype=np.int64)
+        self.last_food_distance = np.full(n, np.inf)
+        self.distance_improvements = np.zeros(n, dtype=np.int64)
+        self.last_direction_change = np.zeros(n, dtype=np.int64)
+        self.last_loop_penalty_step = np.zeros(n, dtype=np.int64)
+
+        # Loop detection windows, newest entry last
+        self.decisions = np.zeros(n, dtype=np.int64)
+        self.pattern = np.zeros((n, PATTERN_WINDOW), dtype=np.int8)
+        self.recent_positions = np.zeros((n, RECENT_POSITIONS, 2), dtype=np.int64)
+        self.recent_count = np.zeros(n, dtype=np.int64)
+
+        # Recorded rows keep their start direction, the action of every decision and every food they were given
+        if self.record_rows is not None:
+            count = len(self.record_rows)
+            self.record_slot = np.full(n, -1)
+            self.record_slot[self.record_rows] = np.arange(count)
+            self.record_direction = self.direction[self.record_rows]
+            self.record_actions = np.zeros((count, self.max_steps + 1), dtype=np.uint8)
+            self.record_food = np.zeros((count, self.max_steps + 2, 2), dtype=np.int16)
+
+        self.food = np.zeros((n, 2), dtype=np.int64)
+        self.food_index = np.zeros(n, dtype=np.int64)
+        self.place_food(np.arange(n))
+
+    def place_food(self, rows):
+        # Uniform over the spawn cells the snake doesn't cover, like Food with a FreeCellIndex.
+        # A draw in [0, 1) picks the free cell of that rank, so seeded draws stay the same for every brain.
+        if self.food_table is not None:
+            draws = self.food_table[self.row_episode[rows], self.food_index[rows]]
+        else:
+            draws = np.random.random_sample(len(rows))
+
+        free = ~self.occupied[rows[:, None], self.spawn_cells]
+        rank = (draws * free.sum(axis=1)).astype(np.int64)
+        cells = self.spawn_cells[(np.cumsum(free, axis=1) > rank[:, None]).argmax(axis=1)]
+        self.food[rows, 0] = cells % self.row_stride - 1
+        self.food[rows, 1] = cells // self.row_stride - 1
+
+        if self.record_rows is not None:
+            recorded = rows[self.record_slot[rows] >= 0]
+            self.record_food[self.record_slot[recorded], self.food_index[recorded]] = self.food[recorded]
+        self.food_index[rows] += 1
+
+    def sensor_inputs(self, rows, head, food):
+        direction = self.direction[rows]
+        turns = TURNS[direction]
+        next_cells = self.head_cell[rows, None] + self.cell_offsets[turns]
+
+        inputs = np.empty((len(rows), 4), dtype=np.float32)
+        inputs[:, :3] = self.occupied[rows[:, None], next_cells]
+
+        # Sine of the angle between the heading and the food, like AISnake
+        heading = DIRECTION_OFFSETS[direction]
+        food_vec = (food - head).astype(float)
+        norm = np.sqrt(food_vec[:, 0] ** 2 + food_vec[:, 1] ** 2)
+        on_food = norm == 0
+        norm[on_food] = 1.0
+        sin_angle = heading[:, 0] * (food_vec[:, 1] / norm) - heading[:, 1] * (food_vec[:, 0] / norm)
+        sin_angle[on_food] = 0.0
+        inputs[:, 3] = sin_angle
+        return inputs, turns
+
+    def make_decisions(self, rows):
+        inputs, turns = self.sensor_inputs(rows, self.head[rows], self.food[rows])
+        actions = self.network.decide(inputs, rows if self.brain_rows is None else self.brain_rows[rows])
+        new_direction = turns[np.arange(len(rows)), actions]
+
+        if self.record_rows is not None:
+            recorded = self.record_slot[rows] >= 0
+            self.record_actions[self.record_slot[rows[recorded]], self.decisions[rows[recorded]]] = actions[recorded]
+
+        changed = rows[actions != 0]
+        self.last_direction_change[changed] = self.steps[changed]
+        self.direction[rows] = new_direction
+
+        pattern = self.pattern[rows]
+        pattern[:, :-1] = pattern[:, 1:]
+        pattern[:, -1] = new_direction
+        self.pattern[rows] = pattern
+        self.decisions[rows] += 1
+
+    def move(self, rows):
+        direction = self.direction[rows]
+        new_cell = self.head_cell[rows] + self.cell_offsets[direction]
+
+        blocked = self.occupied[rows, new_cell]
+        if blocked.any():
+            wall = self.walls[new_cell[blocked]]
+            self.kill(rows[blocked][wall], WALL_COLLISION)
+            self.kill(rows[blocked][~wall], SELF_COLLISION)
+            moved = ~blocked
+            rows, new_cell, direction = rows[moved], new_cell[moved], direction[moved]
+
+        new_head = self.head[rows] + DIRECTION_OFFSETS[direction]
+
+        # Update position for loop detection
+        recent = self.recent_positions[rows]
+        recent[:, :-1] = recent[:, 1:]
+        recent[:, -1] = new_head
+        self.recent_positions[rows] = recent
+        self.recent_count[rows] = np.minimum(self.recent_count[rows] + 1, RECENT_POSITIONS)
+        self.position_counts[rows, new_cell] += 1
+
+        # Push the new head, then drop the tail unless the snake is growing
+        growing = self.grow_next[rows]
+        shrinking = rows[~growing]
+        tail_index = (self.head_index[shrinking] + 1 - self.length[shrinking]) % self.body_capacity
+        self.occupied[shrinking, self.body[shrinking, tail_index]] = False
+
+        head_index = (self.head_index[rows] + 1) % self.body_capacity
+        self.head_index[rows] = head_index
+        self.body[rows, head_index] = new_cell
+        self.occupied[rows, new_cell] = True
+        self.head[rows] = new_head
+        self.head_cell[rows] = new_cell
+        self.length[rows[growing]] += 1
+        self.grow_next[rows] = False
+
+        self.steps[rows] += 1
+        return rows, new_head, new_cell
+
+    def update_fitness(self, rows, head, cell):
+        steps = self.steps[rows]
+        fitness = self.fitness[rows]
+
+        # Base survival + distance-based fitness
+        fitness += 0.1
+        current_distance = np.abs(head - self.food[rows]).sum(axis=1).astype(float)
+        last_distance = self.last_food_distance[rows]
+        normalized_distance = np.minimum(current_distance / self.max_distance, 1.0)
+
+        first = np.isinf(last_distance)
+        change = np.where(first, 0.0, last_distance - current_distance)
+        closer, farther = change > 0, change < 0
+        distance_reward = np.full(len(rows), -0.05)
+        distance_reward[closer] = change[closer] * 8.0
+        distance_reward[farther] = -np.abs(change[farther]) * 1.5
+        distance_reward[first] = (1.0 - normalized_distance[first]) * 3.0
+        fitness += distance_reward
+        fitness -= self.repetition_penalty(rows, steps, cell)
+
+        # Exploration bonus
+        zones = self.cell_zone[cell]
+        new_zone = ~self.zones_visited[rows, zones]
+        fitness += new_zone * 5.0
+        self.zones_visited[rows, zones] = True
+
+        # Direction change bonus
+        recent_pattern = self.pattern[rows, -3:]
+        varied = (recent_pattern[:, 0] != recent_pattern[:, 1]) | (recent_pattern[:, 1] != recent_pattern[:, 2])
+        turned = ((steps > 10) & (steps - self.last_direction_change[rows] < 3) &
+                  (self.decisions[rows] >= 3) & varied)
+        fitness += turned * 1.0
+
+        # Update tracking variables
+        improved = current_distance < last_distance
+        self.distance_improvements[rows] += improved
+        idle_steps = (self.idle_steps[rows] + 1) * ~improved
+        self.idle_steps[rows] = idle_steps
+        self.last_food_distance[rows] = current_distance
+
+        # Proximity bonus + idle penalties
+        fitness += (1.0 - normalized_distance) * 0.15
+        fitness -= ((idle_steps > 30) & (steps > 50)) * ((idle_steps - 30) * 0.05)
+
+        timed_out = idle_steps > MAX_IDLE_STEPS
+        fitness -= timed_out * 30.0
+        self.fitness[rows] = fitness
+        self.kill(rows[timed_out], IDLE_TIMEOUT)
+
+    def repetition_penalty(self, rows, steps, cell):
+        checked = steps - self.last_loop_penalty_step[rows] >= 5
+        position_visits = self.position_counts[rows, cell].astype(np.int64)
+        penalty = np.zeros(len(rows))
+
+        # Position revisit penalty
+        revisits = checked & (position_visits >= LOOP_PENALTY_THRESHOLD)
+        penalty += revisits * ((position_visits - LOOP_PENALTY_THRESHOLD + 1) ** 2 * 2.0)
+
+        # AISnake only keeps 10 recent directions, so its 20-step same-direction penalty never fires.
+        # Turns are always relative, so back-and-forth moves can't happen either.
+
+        # Circular pattern penalty over the last 2, 3 or 4 step cycles
+        pattern = self.pattern[rows]
+        circular = np.zeros(len(rows), dtype=bool)
+        for cycle_len in (2, 3, 4):
+            first_cycle = pattern[:, PATTERN_WINDOW - 2 * cycle_len:PATTERN_WINDOW - cycle_len]
+            second_cycle = pattern[:, PATTERN_WINDOW - cycle_len:]
+            circular |= (first_cycle == second_cycle).all(axis=1)
+        circular &= checked & (self.decisions[rows] >= PATTERN_WINDOW)
+        penalty += circular * 15.0
+        self.last_loop_penalty_step[rows[circular]] = steps[circular]
+
+        # Bounded exploration penalty, only the last recent_count positions are in the window
+        windowed = checked & (self.recent_count[rows] >= 15)
+        if windowed.any():
+            window_rows = rows[windowed]
+            recent = self.recent_positions[window_rows]
+            count = self.recent_count[window_rows]
+            stale = np.arange(RECENT_POSITIONS) < RECENT_POSITIONS - count[:, None]
+            newest = recent[:, -1:, :]
+            recent[stale] = newest[np.nonzero(stale)[0], 0]
+            span = recent.max(axis=1) - recent.min(axis=1)
+            bounded = np.zeros(len(rows), dtype=bool)
+            bounded[windowed] = (span[:, 0] <= 4) & (span[:, 1] <= 4)
+            penalty += bounded * 5.0
+
+        # Kill if stuck in a loop
+        stuck = checked & (position_visits >= MAX_POSITION_REVISITS)
+        penalty += stuck * 25.0
+        self.kill(rows[stuck], STUCK_IN_LOOP)
+
+        return penalty
+
+    def kill(self, rows, reason):
+        self.alive[rows] = False
+        self.death[rows] = reason
+
+    def eat_food(self, rows):
+        eaters = rows[(self.head[rows] == self.food[rows]).all(axis=1)]
+        if len(eaters) == 0:
+            return
+
+        self.grow_next[eaters] = True
+        self.food_eaten[eaters] += 1
+        self.idle_steps[eaters] = 0
+
+        # Keep the last 10 recent positions and decay visit counts, like AISnake.grow
+        self.recent_count[eaters] = np.minimum(self.recent_count[eaters], 10)
+        self.position_counts[eaters] = np.maximum(self.position_counts[eaters] - 1, 0)
+
+        self.place_food(eaters)
+
+    def step(self):
+        """Advance every living snake by one tick, returns False once the episode is over"""
+        rows = np.flatnonzero(self.alive)
+        if len(rows) == 0 or self.tick >= self.max_steps:
+            return False
+
+        self.make_decisions(rows)
+        moved, head, cell = self.move(rows)
+        self.update_fitness(moved, head, cell)
+
+        # The trainer checks for food after every update, even on the step a snake dies
+        self.eat_food(rows)
+        self.tick += 1
+        return True
+
+    def get_recordings(self):
+        """An EpisodeRecord of every recorded row, in record_rows order"""
+        recordings = []
+        if self.record_rows is None:
+            return recordings
+
+        for slot, row in enumerate(self.record_rows.tolist()):
+            seed = -1 if self.seeds is None else self.seeds[self.row_episode[row]]
+            recordings.append(EpisodeRecord(self.start_cell, self.record_direction[slot],
+                                            self.record_actions[slot, :self.decisions[row]],
+                                            self.record_food[slot, :self.food_index[row]], self.steps[row],
+                                            DEATH_REASONS[self.death[row]], seed))
+        return recordings
+
+    def run(self):
+        while self.step():
+            pass
+        return self.get_results()
+
+    def final_fitness_bonus(self):
+        # Same terms as AISnake.evaluate_final_fitness
+        total_revisits = np.maximum(self.position_counts.astype(np.int64) - 1, 0).sum(axis=1)
+        return (self.food_eaten * 100 + self.steps * 0.05 + self.length * 20 +
+                self.distance_improvements * 3 + np.where(self.alive, 0, -25) - total_revisits * 0.5)
+
+    def get_results(self):
+        return {
+            'fitness': self.fitness.copy(),
+            'final_fitness_bonus': self.final_fitness_bonus(),
+            'food_eaten': self.food_eaten.copy(),
+            'steps': self.steps.copy(),
+            'length': self.length.copy(),
+            'alive': self.alive.copy(),
+            'death': self.death.copy(),
+            'distance_improvements': self.distance_improvements.copy(),
+            'body': self.get_bodies()
+        }
+
+    def get_bodies(self):
+        """Every body as grid (x, y) cells, head first, concatenated in snake order"""
+        segment = np.arange(self.length.max())
+        slots = (self.head_index[:, None] - segment) % self.body_capacity
+        cells = np.take_along_axis(self.body, slots, axis=1)[segment < self.length[:, None]]
+        return np.stack([cells % self.row_stride - 1, cells // self.row_stride - 1], axis=1).astype(np.int16)
+
+
+def aggregate_episodes(results, episodes, aggregate="mean"):
+    """
+    Folds brain-major results of several episodes per brain into one result per brain.
+    aggregate is "mean" or a quantile between 0 and 1. Fitness and bonus are set so that both
+    evaluate_final_fitness passes the GA makes land on the aggregate of the per-episode values.
+    The other fields come from the episode whose final fitness is closest to the aggregate.
+
+    """
+    if episodes == 1:
+        return results
+
+    def combine(values):
+        if aggregate == "mean":
+            return values.mean(axis=1)
+        return np.quantile(values, float(aggregate), axis=1)
+
+    # Per-episode fitness after the first and the second evaluate_final_fitness
+    bonus = results['final_fitness_bonus'].reshape(-1, episodes)
+    first = np.maximum(0, results['fitness'].reshape(-1, episodes) + bonus)
+    second = np.maximum(0, first + bonus)
+    first_total, second_total = combine(first), combine(second)
+
+    brains = np.arange(len(first))
+    picked = brains * episodes + np.abs(second - second_total[:, None]).argmin(axis=1)
+
+    bodies = np.split(results['body'], np.cumsum(results['length'])[:-1])
+    aggregated = {key: value[picked] for key, value in results.items() if key != 'body'}
+    aggregated['final_fitness_bonus'] = second_total - first_total
+    aggregated['fitness'] = first_total - aggregated['final_fitness_bonus']
+    aggregated['episode_fitness'] = second
+    aggregated['body'] = np.concatenate([bodies[i] for i in picked])
+    return aggregated
+
+
+def apply_results(snakes, results):
+    """Write episode results back onto the AISnake objects that own the brains"""
+    bodies = np.split(results['body'].astype(int), np.cumsum(results['length'])[:-1])
+
+    for i, snake in enumerate(snakes):
+        snake.reset()
+        snake.fitness = float(results['fitness'][i])
+        snake.final_fitness_bonus = float(results['final_fitness_bonus'][i])
+        snake.food_eaten = int(results['food_eaten'][i])
+        snake.steps = int(results['steps'][i])
+        snake.alive = bool(results['alive'][i])
+        snake.death_reason = DEATH_REASONS[results['death'][i]]
+        snake.distance_improvements = int(results['distance_improvements'][i])
+        snake.set_body([tuple(cell) for cell in bodies[i].tolist()])
@@ -4,6 +4,8 @@ import pygame
 class Score:
     def __init__(self):
         self.value = 0
+        self.text = None
+        self.text_value = None
 
     def increment(self):
         self.value += 1
@@ -11,6 +13,12 @@ class Score:
     def reset(self):
         self.value = 0
 
+    def sprite(self, screen_width, font):
+        # Re-rendered only when the score changes
+        if self.text is None or self.text_value != self.value:
+            self.text = font.render(f"Score: {self.value}", True, (255, 255, 255))
+            self.text_value = self.value
+        return self.text, (screen_width - self.text.get_width() - 10, 10)
+
     def draw(self, surface, screen_width, font):
-        text = font.render(f"Score: {self.value}", True, (255, 255, 255))
-        surface.blit(text, (screen_width - text.get_width() - 10, 10))
\ No newline at end of file
+        surface.blit(*self.sprite(screen_width, font))
\ No newline at end of file
@@ -1,66 +1,75 @@
 # src/game/snake.py
 import pygame
 import os
+from src.ui.assets import load_sprite
+from src.game.free_cells import FreeCellIndex
+from src.game.grid import DIRECTION_OFFSETS, RIGHT, DOWN, LEFT, UP, opposite, to_pixels
+
+# Arrow keys and the direction code they steer to
+KEY_DIRECTIONS = [(pygame.K_UP, UP), (pygame.K_DOWN, DOWN), (pygame.K_LEFT, LEFT), (pygame.K_RIGHT, RIGHT)]
 
 class Snake:
     def __init__(self, start_pos, tile_size, screen_width, screen_height):
         self.tile_size = tile_size
         self.screen_width = screen_width
         self.screen_height = screen_height
+        self.grid_width = screen_width // tile_size
+        self.grid_height = screen_height // tile_size
 
+        # Body in grid cells, head first
         self.body = [start_pos]
-        self.direction = (tile_size, 0)  
+        self.free_cells = FreeCellIndex(self.grid_width, self.grid_height)
+        self.free_cells.reset(self.body)
+        self.direction = RIGHT
         self.grow_next = False
         self.alive = True
 
-        # Load snake image
+        # Snake sprites, fetched from the shared asset cache when drawn
         base_dir = os.path.dirname(os.path.abspath(__file__))
         assets_path = os.path.join(base_dir, "..", "..", "assets")
-        self.image = pygame.image.load(os.path.join(assets_path, "snake_live.PNG")).convert_alpha()
-        self.image = pygame.transform.scale(self.image, (tile_size, tile_size))
-
-        self.death_image = pygame.image.load(os.path.join(assets_path, "snake_dead.PNG")).convert_alpha()
-        self.death_image = pygame.transform.scale(self.death_image, (tile_size, tile_size))
+        self.image_path = os.path.join(assets_path, "snake_live.PNG")
+        self.death_image_path = os.path.join(assets_path, "snake_dead.PNG")
 
     def handle_input(self, keys):
-        if keys[pygame.K_UP] and self.direction != (0, self.tile_size):
-            self.direction = (0, -self.tile_size)
-        elif keys[pygame.K_DOWN] and self.direction != (0, -self.tile_size):
-            self.direction = (0, self.tile_size)
-        elif keys[pygame.K_LEFT] and self.direction != (self.tile_size, 0):
-            self.direction = (-self.tile_size, 0)
-        elif keys[pygame.K_RIGHT] and self.direction != (-self.tile_size, 0):
-            self.direction = (self.tile_size, 0)
+        # The snake can't reverse into itself
+        for key, direction in KEY_DIRECTIONS:
+            if keys[key] and self.direction != opposite(direction):
+                self.direction = direction
+                break
 
     def move(self):
         if not self.alive:
             return
 
         head_x, head_y = self.body[0]
-        dx, dy = self.direction
+        dx, dy = DIRECTION_OFFSETS[self.direction]
         new_head = (head_x + dx, head_y + dy)
 
         # Die if out of bounds
-        if (new_head[0] < 0 or new_head[0] >= self.screen_width or
-            new_head[1] < 0 or new_head[1] >= self.screen_height or
+        if (new_head[0] < 0 or new_head[0] >= self.grid_width or
+            new_head[1] < 0 or new_head[1] >= self.grid_height or
             new_head in self.body):
             self.die()
             return
 
         self.body.insert(0, new_head)
+        self.free_cells.occupy(new_head)
 
         if self.grow_next:
             self.grow_next = False
         else:
-            self.body.pop()
+            self.free_cells.release(self.body.pop())
 
 
     def grow(self):
         self.grow_next = True
 
+    def sprites(self):
+        img = load_sprite(self.death_image_path if not self.alive else self.image_path, self.tile_size)
+        return [(img, to_pixels(segment, self.tile_size)) for segment in self.body]
+
     def draw(self, surface):
-        for segment in self.body:
-            img = self.death_image if not self.alive else self.image
+        for img, segment in self.sprites():
             surface.blit(img, segment)
 
     def head_position(self):
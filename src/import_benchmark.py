@@ -0,0 +1,95 @@
+"""
+Filename: import_benchmark.py
+Description: Measures how long the core modules take to import in a fresh interpreter and checks that
+none of them pull in pygame. Worker processes and CLI tools pay this cost on every start.
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+# Modules that must import without a display or pygame
+CORE_MODULES = [
+    "src.Brain.neural_network",
+    "src.Brain.genetic_algorithm",
+    "src.Brain.model_manager",
+    "src.Brain.decision_table",
+    "src.Brain.parallel_evaluation",
+    "src.game.ai_snake",
+    "src.game.population_sim",
+    "src.game.episode_record",
+    "src.ui.spectator",
+    "src.game.item",
+]
+
+# Third-party packages every module needs anyway, reported apart from our own import time
+SHARED_DEPENDENCIES = ["numpy"]
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def measure_import(module, repeats):
+    """Import a module in fresh interpreters, returns the fastest run in milliseconds"""
+    code = f"import sys, {module}; print('pygame' in sys.modules)"
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT_DIR, os.path.join(ROOT_DIR, "src")]))
+
+    best = None
+    for _ in range(repeats):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                                capture_output=True, text=True, env=env)
+        if result.returncode != 0:
+            raise RuntimeError(f"Error importing {module}:\n{result.stderr}")
+
+        # -X importtime lines look like "import time: self [us] | cumulative | imported package"
+        cumulative = {}
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative_us, name = line.split("|")
+            cumulative[name.strip()] = int(cumulative_us)
+
+        total = cumulative[module] / 1000
+        dependencies = sum(cumulative.get(name, 0) for name in SHARED_DEPENDENCIES) / 1000
+        run = {
+            "total_ms": round(total, 2),
+            "own_ms": round(total - dependencies, 2),
+            "pygame_loaded": result.stdout.strip() == "True"
+        }
+        if best is None or run["own_ms"] < best["own_ms"]:
+            best = run
+
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the import time of the pygame-free core")
+    parser.add_argument("--repeats", type=int, default=5, help="fresh interpreters per module, the fastest counts")
+    parser.add_argument("--budget-ms", type=float, default=50.0,
+                        help="allowed import time per module, not counting numpy")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    results = {module: measure_import(module, args.repeats) for module in CORE_MODULES}
+
+    if args.json:
+        print(json.dumps(results, indent=4))
+    else:
+        print(f"{'module':<34}{'total ms':>10}{'own ms':>10}  pygame")
+        for module, run in results.items():
+            print(f"{module:<34}{run['total_ms']:>10.1f}{run['own_ms']:>10.1f}  {'yes' if run['pygame_loaded'] else 'no'}")
+
+    failed = False
+    for module, run in results.items():
+        if run["pygame_loaded"]:
+            print(f"Error: {module} imports pygame.")
+            failed = True
+        if run["own_ms"] > args.budget_ms:
+            print(f"Error: {module} takes {run['own_ms']:.1f} ms to import, budget is {args.budget_ms:.1f} ms.")
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,9 @@ from ui.end_screen import EndScreen
 from game.snake import Snake
 from game.item import Food
 from game.score import Score
+from game.grid import center_cell
+from src.ui.assets import load_image
+from src.ui.renderer import DirtyRenderer
 from constants import WIDTH, HEIGHT, FPS, TILE_SIZE, ORB_COUNT, \
                       DEATH_DELAY, \
                       BG_PATH, ICON_PATH, TITLE_CARD_PATH, MUSIC_PATH
@@ -21,14 +24,13 @@ def main():
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption("Evoluvine🐍")
 
-    background = pygame.image.load(BG_PATH).convert()
-    background = pygame.transform.scale(background, (WIDTH, HEIGHT))
+    background = load_image(BG_PATH, (WIDTH, HEIGHT), alpha=False)
 
     icon = pygame.image.load(ICON_PATH)
     pygame.display.set_icon(icon)
 
-    title_card = pygame.image.load(TITLE_CARD_PATH).convert_alpha()
-    title_card = pygame.transform.scale(title_card, (
+    title_card = load_image(TITLE_CARD_PATH)
+    title_card = pygame.transform.smoothscale(title_card, (
         int(title_card.get_width() * 1.5), int(title_card.get_height() * 1.5)))
 
     clock = pygame.time.Clock()
@@ -36,14 +38,16 @@ def main():
 
     orbs = [AmbientOrb(WIDTH, HEIGHT) for _ in range(ORB_COUNT)]
     end_screen = EndScreen()
+    renderer = DirtyRenderer(screen, background)
 
     while True:
         show_title_screen(screen, background, title_card)
+        renderer.invalidate()
 
-        snake = Snake(start_pos=(WIDTH // 2, HEIGHT // 2), tile_size=TILE_SIZE,
+        snake = Snake(start_pos=center_cell(WIDTH, HEIGHT, TILE_SIZE), tile_size=TILE_SIZE,
                       screen_width=WIDTH, screen_height=HEIGHT)
 
-        food = Food(WIDTH, HEIGHT, TILE_SIZE)
+        food = Food(WIDTH, HEIGHT, TILE_SIZE, snake.free_cells)
         score = Score()
 
         MOVE_DELAY = 8
@@ -61,21 +65,18 @@ def main():
                     pygame.quit()
                     sys.exit()
 
-            screen.blit(background, (0, 0))
-
             for orb in orbs:
                 orb.update()
-                orb.draw(screen)
+            sprites = [orb.sprite() for orb in orbs]
 
             if not snake.alive:
-                snake.draw(screen)
+                renderer.draw(sprites + snake.sprites())
                 if death_time is None:
                     death_time = current_time
                 elif current_time - death_time > DEATH_DELAY and not game_over_displayed:
                     end_screen.show(screen)
                     game_over_displayed = True
                     running = False
-                pygame.display.flip()
                 continue
 
             keys = pygame.key.get_pressed()
@@ -88,16 +89,14 @@ def main():
 
                 if food.collision(snake.head_position()):
                     snake.grow()
-                    food.reset_away_from_snake(snake.body)
+                    food.reset(snake.free_cells)
                     score.increment()
 
-            snake.draw(screen)
             food.update()
-            food.draw(screen)
-
-            score.draw(screen, WIDTH, font)
-
-            pygame.display.flip()
+            sprites += snake.sprites()
+            sprites.append(food.sprite())
+            sprites.append(score.sprite(WIDTH, font))
+            renderer.draw(sprites)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,133 @@
+"""
+Filename: profiling.py
+Description: Per-phase wall time and call counts for each training generation, with optional cProfile
+and tracemalloc runs around whole generations. Every generation is appended as one JSON line next to the
+training summary. cProfile, pstats and tracemalloc are only imported by the generations that use them.
+"""
+import io
+import os
+import json
+import time
+
+
+class Phase:
+    """Context manager returned by PhaseTimer.phase, times one call of a phase"""
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.timer.enter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.exit(self.name)
+        return False
+
+
+class PhaseTimer:
+    """
+    Records how long each named phase took and how often it ran, per generation.
+    Phases can nest, a phase's time excludes the phases running inside it, so the phases of a
+    generation add up to its wall time.
+
+    """
+
+    def __init__(self):
+        self.history = []
+        self.generation = None
+        self.phases = {}
+        self.stack = []  # [start, time spent in nested phases] per open phase
+        self.profiler = None
+        self.tracing = False
+        self.generation_start = None
+
+    def phase(self, name):
+        return Phase(self, name)
+
+    def enter(self):
+        self.stack.append([time.perf_counter(), 0.0])
+
+    def exit(self, name):
+        start, nested = self.stack.pop()
+        elapsed = time.perf_counter() - start
+        if self.stack:
+            self.stack[-1][1] += elapsed
+
+        totals = self.phases.get(name)
+        if totals is None:
+            totals = self.phases[name] = [0.0, 0]
+        totals[0] += elapsed - nested
+        totals[1] += 1
+
+    def start_generation(self, generation, profile=False, trace_memory=False):
+        self.generation = generation
+        self.phases = {}
+
+        if trace_memory:
+            import tracemalloc
+            tracemalloc.start()
+            self.tracing = True
+        if profile:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.generation_start = time.perf_counter()
+
+    def end_generation(self, profile_dir=None, top=20):
+        wall_time = time.perf_counter() - self.generation_start
+        record = {
+            "generation": self.generation,
+            "wall_time": round(wall_time, 6),
+            "phases": {name: {"time": round(total, 6), "calls": calls} for name, (total, calls) in self.phases.items()}
+        }
+        record["phases"]["other"] = {
+            "time": round(max(0.0, wall_time - sum(total for total, _ in self.phases.values())), 6),
+            "calls": 1
+        }
+
+        if self.profiler is not None:
+            self.profiler.disable()
+            record["profile"] = self.profile_report(self.profiler, top)
+            if profile_dir:
+                path = os.path.join(profile_dir, f"profile_generation_{self.generation}.prof")
+                self.profiler.dump_stats(path)
+                record["profile_path"] = path
+            self.profiler = None
+
+        if self.tracing:
+            import tracemalloc
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.tracing = False
+            record["memory"] = {
+                "current_bytes": current,
+                "peak_bytes": peak,
+                "top_allocations": [
+                    {"location": str(stat.traceback), "bytes": stat.size, "count": stat.count}
+                    for stat in snapshot.statistics("lineno")[:top]
+                ]
+            }
+
+        self.history.append(record)
+        return record
+
+    def profile_report(self, profiler, top):
+        # Functions with the largest cumulative time, as plain text lines from pstats
+        import pstats
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream)
+        stats.sort_stats("cumulative").print_stats(top)
+        return [line for line in stream.getvalue().splitlines() if line.strip()]
+
+    def append(self, path, record):
+        # One JSON line per generation, so a save never rewrites the generations before it
+        try:
+            with open(path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+            return True
+        except Exception as e:
+            print(f"Error saving profile: {e}")
+            return False
@@ -1,166 +1,278 @@
-import pygame
-import sys
+import argparse
 import numpy as np
 import os
 import json
-import pickle
-from datetime import datetime
 from constants import *
 from src.Brain.genetic_algorithm import GeneticAlgorithm
-from src.game.item import Food
-from ui.ambient_orb import AmbientOrb
 from src.Brain.model_manager import ModelManager
+from src.game.episode_record import append_records, truncate_records
+from src.profiling import PhaseTimer
 
 POPULATION_SIZE = 250
 INPUT_SIZE = 4  # [forward_danger, left_danger, right_danger, food_angle_sin]
 HIDDEN_SIZE = 6 # Neurons in Hidden Layer
 OUTPUT_SIZE = 3  # [forward, left, right]
 GENERATION_LIMIT = 150
-ORB_COUNT = 6
 MAX_STEPS_PER_SNAKE = 1000 # Time out per generation
+PROFILE_PATH = os.path.join(MODEL_DIR, "training_profile.jsonl")
+VISUALIZE_EVERY = 50 # Record every 50th snake for the spectator window
 
 EARLY_STOP_FITNESS = 15000  # Stop training if this fitness is achieved
 
 model_manager = ModelManager()
+timer = PhaseTimer()
 
-pygame.init()
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Snake AI Training")
-clock = pygame.time.Clock()
-font = pygame.font.SysFont(None, 18)
+# Track best performance across all generations, as plain values taken when the record is set
+all_time_best_fitness = 0
+all_time_best_generation = 0
+all_time_best_genome = None
+all_time_best_food_eaten = 0
+all_time_best_steps = 0
 
-background = pygame.image.load(BG_PATH)
-background = pygame.transform.scale(background, (WIDTH, HEIGHT))
-orbs = [AmbientOrb(WIDTH, HEIGHT, TILE_SIZE) for _ in range(ORB_COUNT)]
 
-icon = pygame.image.load(ICON_PATH)
-pygame.display.set_icon(icon)
+def positive_int(value):
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got '{value}'")
+    return number
 
-ga = GeneticAlgorithm(POPULATION_SIZE, INPUT_SIZE, HIDDEN_SIZE, OUTPUT_SIZE, WIDTH, HEIGHT, TILE_SIZE)
 
-# Track best performance across all generations
-all_time_best_fitness = 0
-all_time_best_snake = None
-all_time_best_generation = 0
-fitness_history = []
-generation_stats = []
-
-print("Training Started")
-print("="*60)
-
-generation = 0
-while generation < GENERATION_LIMIT:
-    print(f"\nGeneration {generation + 1}/{GENERATION_LIMIT}")
-    
-    population = ga.get_population()
-    
-    for snake_idx, snake in enumerate(population):
-        snake.reset()
-        food = Food(WIDTH, HEIGHT, TILE_SIZE)
-        steps = 0
-
-        while snake.alive and steps < MAX_STEPS_PER_SNAKE:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    if all_time_best_snake:
-                        model_manager.save_best_model(all_time_best_snake)
-                    pygame.quit()
-                    sys.exit()
-
-            snake.update(food)
-            if food.collision(snake.head_pos()):
-                snake.grow()
-                food.reset()
-           # visualize every 50th snake
-            if snake_idx % 50 == 0: 
-                screen.blit(background, (0, 0))
-                
-                #Draw background ambient orbs
-                for orb in orbs:
-                    orb.update()
-                    orb.draw(screen)
-                
-                # Draw snake
-                snake.draw(screen)
-                
-                # Draw food
-                food.update()
-                food.draw(screen)
-                
-                # Display info on screen
-                info_lines = [
-                    f"Generation: {generation + 1}/{GENERATION_LIMIT}",
-                    f"Snake: {snake_idx + 1}/{POPULATION_SIZE}",
-                    f"Steps: {steps}/{MAX_STEPS_PER_SNAKE}",
-                    f"Current Fitness: {snake.fitness:.2f}",
-                    f"Food Eaten: {snake.food_eaten}",
-                    f"Body Length: {len(snake.body)}",
-                    f"All-Time Best: {all_time_best_fitness:.2f}",
-                    f"Best Gen: {all_time_best_generation}"
-                ]
-                
-                for i, line in enumerate(info_lines):
-                    text_surface = font.render(line, True, (255, 255, 255))
-                    screen.blit(text_surface, (10, 10 + i * 24))
-                
-                pygame.display.flip()
-                clock.tick(FPS)
-            
-            steps += 1
-        
-        # Evaluate final fitness
-        snake.evaluate_final_fitness()
-    
-    # Calculate generation statistics
-    fitnesses = [snake.fitness for snake in population]
-    best_fitness = max(fitnesses)
-    avg_fitness = np.mean(fitnesses)
-    worst_fitness = min(fitnesses)
-    std_fitness = np.std(fitnesses)
-    best_snake = max(population, key=lambda s: s.fitness)
-    
-    # Print generation results
-    print(f"   Best Fitness: {best_fitness:.2f}")
-    print(f"   Avg Fitness: {avg_fitness:.2f}")
-    
-    # Check if this is the best snake ever
-    if best_fitness > all_time_best_fitness:
-        all_time_best_fitness = best_fitness
-        all_time_best_snake = best_snake
-        all_time_best_generation = generation + 1
-        print(f"🐍 NEW RECORD Fitness: {best_fitness:.2f}")
-        
-        # Save the Best Model
-        model_manager.save_best_model(best_snake)
-
-        summary = {
-            "best_fitness": round(best_fitness, 2),
-            "generation": all_time_best_generation,
-            "population_size": POPULATION_SIZE,
-            "food_eaten": best_snake.food_eaten,
-            "time_alive": best_snake.steps
-        }
-
-        # Save Model sumamry stats
-        summary_path = os.path.join(MODEL_DIR, "training_summary.json")
-        with open(summary_path, "w") as f:
-            json.dump(summary, f, indent=4)
-        print(f"📁 Summary updated at: {summary_path}")
-
-        if best_fitness >= EARLY_STOP_FITNESS:
-            print(f"\n EARLY STOP: {EARLY_STOP_FITNESS} fitness achieved.")
-            break
-
-    
-    ga.create_next_generation()
-    generation += 1
-
-# Training complete
-print("\n" + "="*60)
-print("TRAINING COMPLETE!")
-print("="*60)
-
-# Save Best Snake Stats for Confirmation
-final_best_snake = all_time_best_snake if all_time_best_snake else ga.get_best_snake()
-final_fitness = all_time_best_fitness if all_time_best_snake else final_best_snake.fitness
-final_generation = all_time_best_generation if all_time_best_snake else generation
+def worker_count(value):
+    # 0 still means every core
+    try:
+        number = int(value)
+    except ValueError:
+        number = -1
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be 0 for every core or a positive integer, got '{value}'")
+    return number
+
+
+def fitness_aggregate(value):
+    # "mean" or a quantile, argparse turns the error into a usage message
+    if value == "mean":
+        return value
+    try:
+        quantile = float(value)
+    except ValueError:
+        quantile = None
+    if quantile is None or not 0 <= quantile <= 1:
+        raise argparse.ArgumentTypeError(f"must be 'mean' or a quantile between 0 and 1, got '{value}'")
+    return quantile
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train Evoluvine snakes with a genetic algorithm")
+    parser.add_argument("--headless", action="store_true",
+                        help="train without a spectator window, pygame is never imported")
+    parser.add_argument("--workers", type=worker_count, default=1,
+                        help="worker processes for evaluation, 0 uses every core")
+    parser.add_argument("--episodes", type=positive_int, default=1,
+                        help="episodes per snake, every snake plays the same seeds each generation")
+    parser.add_argument("--fitness-aggregate", type=fitness_aggregate, default="mean",
+                        help="how episode fitnesses are combined: mean, or a quantile such as 0.25")
+    parser.add_argument("--profile-every", type=int, default=0, metavar="N",
+                        help="run every Nth generation under cProfile, 0 disables")
+    parser.add_argument("--trace-memory-every", type=int, default=0, metavar="N",
+                        help="trace allocations with tracemalloc every Nth generation, 0 disables")
+    parser.add_argument("--checkpoint-every", type=int, default=10, metavar="N",
+                        help="save a checkpoint every Nth generation, 0 disables")
+    parser.add_argument("--checkpoint", default=os.path.join(MODEL_DIR, "checkpoint.npz"),
+                        help="checkpoint file to write and resume from")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue training from the checkpoint file")
+    parser.add_argument("--episode-log", default=os.path.join(MODEL_DIR, "episodes.bin"),
+                        help="file the elite snakes' episodes of every generation are appended to, empty disables")
+    return parser.parse_args()
+
+
+def create_spectator(headless):
+    if headless:
+        return None
+
+    # The window lives in its own process, training never waits for it to draw
+    from src.ui.spectator import Spectator
+    return Spectator()
+
+
+def publish_recordings(spectator, recordings, generation):
+    for record in recordings:
+        if record.snake % VISUALIZE_EVERY:
+            continue
+        info = [
+            f"Generation: {generation + 1}/{GENERATION_LIMIT}",
+            f"Snake: {record.snake + 1}/{POPULATION_SIZE}",
+            f"Fitness: {record.fitness:.2f}",
+            f"Food Eaten: {len(record.foods) - 1}",
+            f"All-Time Best: {all_time_best_fitness:.2f}",
+            f"Best Gen: {all_time_best_generation}"
+        ]
+        spectator.publish(record, info)
+
+
+def log_elites(path, ga):
+    # The snakes the next generation keeps, best first by their aggregated fitness, a few hundred bytes each
+    elite_count = max(1, int(POPULATION_SIZE * ga.elitism_rate))
+    elites = sorted(ga.recordings, key=lambda record: ga.population[record.snake].fitness, reverse=True)[:elite_count]
+    append_records(path, elites)
+
+
+def every(interval, generation):
+    return interval > 0 and (generation + 1) % interval == 0
+
+
+def finish_generation():
+    # Phase timings go next to training_summary.json, one line appended per generation
+    record = timer.end_generation(profile_dir=MODEL_DIR)
+    timer.append(PROFILE_PATH, record)
+
+    slowest = sorted(record["phases"].items(), key=lambda item: item[1]["time"], reverse=True)[:3]
+    breakdown = ", ".join(f"{name} {phase['time']:.2f}s" for name, phase in slowest)
+    print(f"   Time: {record['wall_time']:.2f}s ({breakdown})")
+
+
+def save_checkpoint(ga, path):
+    extra = {
+        "best_fitness": all_time_best_fitness,
+        "best_generation": all_time_best_generation
+    }
+    if all_time_best_genome is not None:
+        extra["best_genome"] = all_time_best_genome
+        extra["best_food_eaten"] = all_time_best_food_eaten
+        extra["best_steps"] = all_time_best_steps
+
+    if ga.save_checkpoint(path, extra):
+        print(f"💾 Checkpoint saved at: {path}")
+
+
+def resume_training(ga, path):
+    global all_time_best_fitness, all_time_best_generation, all_time_best_genome
+    global all_time_best_food_eaten, all_time_best_steps
+
+    if not os.path.exists(path):
+        print(f"No checkpoint found at {path}, starting from scratch.")
+        return 0
+
+    checkpoint = GeneticAlgorithm.read_checkpoint(path)
+
+    all_time_best_fitness = float(checkpoint["extra_best_fitness"])
+    all_time_best_generation = int(checkpoint["extra_best_generation"])
+    if "extra_best_genome" in checkpoint:
+        all_time_best_genome = checkpoint["extra_best_genome"].copy()
+        all_time_best_food_eaten = int(checkpoint["extra_best_food_eaten"])
+        all_time_best_steps = int(checkpoint["extra_best_steps"])
+
+    ga.restore_checkpoint(checkpoint)
+    print(f"Resumed from {path} at generation {ga.generation + 1}")
+    return ga.generation
+
+
+def main():
+    global all_time_best_fitness, all_time_best_generation, all_time_best_genome
+    global all_time_best_food_eaten, all_time_best_steps
+
+    args = parse_args()
+    spectator = create_spectator(args.headless)
+
+    ga = GeneticAlgorithm(POPULATION_SIZE, INPUT_SIZE, HIDDEN_SIZE, OUTPUT_SIZE, WIDTH, HEIGHT, TILE_SIZE)
+    ga.timer = timer
+    ga.evaluation_episodes = args.episodes
+    ga.fitness_aggregate = args.fitness_aggregate
+
+    try:
+        print("Training Started")
+        print("="*60)
+
+        generation = resume_training(ga, args.checkpoint) if args.resume else 0
+        # A fresh run starts fresh logs, a resumed one keeps appending
+        for path in [args.episode_log, PROFILE_PATH]:
+            if path and not args.resume and os.path.exists(path):
+                os.remove(path)
+
+        # Episodes logged after the checkpoint, or torn by a crash, are dropped before the run appends again
+        if args.episode_log and args.resume and os.path.exists(args.episode_log):
+            truncate_records(args.episode_log, generation)
+
+        while generation < GENERATION_LIMIT:
+            print(f"\nGeneration {generation + 1}/{GENERATION_LIMIT}")
+            timer.start_generation(generation + 1, profile=every(args.profile_every, generation),
+                                   trace_memory=every(args.trace_memory_every, generation))
+
+            population = ga.get_population()
+
+            # The whole generation is played in lockstep, optionally on many cores, and every episode is recorded
+            ga.evaluate_population(MAX_STEPS_PER_SNAKE, workers=args.workers, record=range(POPULATION_SIZE))
+
+            # Calculate generation statistics
+            with timer.phase("statistics"):
+                fitnesses = [snake.fitness for snake in population]
+                best_fitness = max(fitnesses)
+                avg_fitness = np.mean(fitnesses)
+                best_snake = max(population, key=lambda s: s.fitness)
+
+            # Print generation results
+            print(f"   Best Fitness: {best_fitness:.2f}")
+            print(f"   Avg Fitness: {avg_fitness:.2f}")
+
+            with timer.phase("publish"):
+                if spectator:
+                    publish_recordings(spectator, ga.recordings, generation)
+                if args.episode_log:
+                    log_elites(args.episode_log, ga)
+
+            # Check if this is the best snake ever
+            if best_fitness > all_time_best_fitness:
+                all_time_best_fitness = best_fitness
+                all_time_best_generation = generation + 1
+                all_time_best_genome = best_snake.brain.get_parameters()
+                all_time_best_food_eaten = best_snake.food_eaten
+                all_time_best_steps = best_snake.steps
+                print(f"🐍 NEW RECORD Fitness: {best_fitness:.2f}")
+
+                # Save the Best Model
+                with timer.phase("save_best_model"):
+                    model_manager.save_best_model(best_snake, all_time_best_generation)
+
+                summary = {
+                    "best_fitness": round(best_fitness, 2),
+                    "generation": all_time_best_generation,
+                    "population_size": POPULATION_SIZE,
+                    "food_eaten": best_snake.food_eaten,
+                    "time_alive": best_snake.steps
+                }
+
+                # Save Model sumamry stats
+                summary_path = os.path.join(MODEL_DIR, "training_summary.json")
+                with open(summary_path, "w") as f:
+                    json.dump(summary, f, indent=4)
+                print(f"📁 Summary updated at: {summary_path}")
+
+                if best_fitness >= EARLY_STOP_FITNESS:
+                    finish_generation()
+                    print(f"\n EARLY STOP: {EARLY_STOP_FITNESS} fitness achieved.")
+                    break
+
+            with timer.phase("next_generation"):
+                ga.create_next_generation()
+            if every(args.checkpoint_every, generation):
+                with timer.phase("checkpoint"):
+                    save_checkpoint(ga, args.checkpoint)
+            finish_generation()
+            generation += 1
+
+        # Training complete
+        print("\n" + "="*60)
+        print("TRAINING COMPLETE!")
+        print("="*60)
+    finally:
+        # Worker processes and the spectator window go away even when training stops with an error
+        ga.close()
+        if spectator:
+            spectator.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,10 @@ import pygame
 import random
 import math
 
+# Orb sprites shared by every orb, keyed by radius, color and alpha
+_sprites = {}
+
+
 class AmbientOrb:
     def __init__(self, screen_width, screen_height, pulse_speed=0.05):
         self.x, self.y = random.randint(0, screen_width), random.randint(0, screen_height)
@@ -11,7 +15,7 @@ class AmbientOrb:
         self.base_alpha = 80
         self.alpha_range = 60
         self.time_offset = random.uniform(0, 2 * math.pi)
-        self.surface = pygame.Surface((self.radius * 4, self.radius * 4), pygame.SRCALPHA)
+        self.alpha = self.base_alpha
         self.screen_width = screen_width
         self.screen_height = screen_height
         self.t = 0
@@ -23,9 +27,15 @@ class AmbientOrb:
         self.x = (self.x + self.vx) % self.screen_width
         self.y = (self.y + self.vy) % self.screen_height
 
+    def sprite(self):
+        key = (self.radius, self.color, self.alpha)
+        surface = _sprites.get(key)
+        if surface is None:
+            surface = _sprites[key] = pygame.Surface((self.radius * 4, self.radius * 4), pygame.SRCALPHA)
+            center = (self.radius * 2, self.radius * 2)
+            pygame.draw.circle(surface, (*self.color, self.alpha), center, self.radius * 2)
+            pygame.draw.circle(surface, (*self.color, 255), center, self.radius)
+        return surface, (int(self.x - self.radius * 2), int(self.y - self.radius * 2))
+
     def draw(self, screen):
-        self.surface.fill((0, 0, 0, 0))
-        center = (self.surface.get_width() // 2, self.surface.get_height() // 2)
-        pygame.draw.circle(self.surface, (*self.color, self.alpha), center, self.radius * 2)
-        pygame.draw.circle(self.surface, (*self.color, 255), center, self.radius)
-        screen.blit(self.surface, (self.x - self.radius * 2, self.y - self.radius * 2))
+        screen.blit(*self.sprite())
@@ -0,0 +1,24 @@
+# src/ui/assets.py
+import pygame
+
+# Surfaces shared by every game object in the process, keyed by path, size and alpha
+_images = {}
+
+
+def load_image(path, size=None, alpha=True):
+    """Load an image once per process, converted for the display and optionally scaled"""
+    key = (path, size, alpha)
+    image = _images.get(key)
+
+    if image is None:
+        image = pygame.image.load(path)
+        image = image.convert_alpha() if alpha else image.convert()
+        if size is not None:
+            image = pygame.transform.scale(image, size)
+        _images[key] = image
+
+    return image
+
+
+def load_sprite(path, tile_size):
+    return load_image(path, (tile_size, tile_size))
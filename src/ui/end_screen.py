@@ -1,6 +1,7 @@
 # src/ui/end_screen.py
 import pygame
 import os
+from src.ui.assets import load_image
 
 WIDTH = 800
 HEIGHT = 600
@@ -9,8 +10,7 @@ class EndScreen:
     def __init__(self):
         base_dir = os.path.dirname(os.path.abspath(__file__))
         assets_path = os.path.join(base_dir, "..", "..", "assets")
-        self.image = pygame.image.load(os.path.join(assets_path, "end_screen.PNG")).convert()
-        self.image = pygame.transform.scale(self.image, (WIDTH, HEIGHT))
+        self.image = load_image(os.path.join(assets_path, "end_screen.PNG"), (WIDTH, HEIGHT), alpha=False)
         self.font = pygame.font.Font(None, 25)
         self.text = self.font.render("Press any key to restart", True, (49, 134, 89))
         self.text_rect = self.text.get_rect(center=(WIDTH // 2, HEIGHT - 50))
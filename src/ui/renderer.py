@@ -0,0 +1,58 @@
+# src/ui/renderer.py
+import pygame
+
+
+class DirtyRenderer:
+    """
+    Draws frames given as lists of (image, position) sprites in back to front order over a static
+    background. Only the rectangles of sprites that appeared, moved or disappeared since the last frame
+    are redrawn (background first, then every sprite overlapping them, in order) and sent to the display.
+
+    """
+
+    def __init__(self, screen, background):
+        self.screen = screen
+        self.background = background
+        self.previous = {}  # (id(image), topleft) -> rect of the last frame
+        self.previous_images = []  # keeps last frame's images alive so their ids stay unique
+        self.full_redraw = True
+        self.texts = {}
+
+    def invalidate(self):
+        """Redraw the whole screen next frame, after something else has drawn over it"""
+        self.full_redraw = True
+
+    def text(self, font, string, color=(255, 255, 255)):
+        # Unchanged text keeps the same surface, so it isn't redrawn every frame
+        key = (id(font), string, color)
+        image = self.texts.get(key)
+        if image is None:
+            if len(self.texts) > 256:
+                self.texts.clear()
+            image = self.texts[key] = font.render(string, True, color)
+        return image
+
+    def draw(self, sprites):
+        images = [image for image, _ in sprites]
+        rects = [pygame.Rect(position, image.get_size()) for image, position in sprites]
+        current = {(id(image), rect.topleft): rect for image, rect in zip(images, rects)}
+
+        if self.full_redraw:
+            self.screen.blit(self.background, (0, 0))
+            for image, rect in zip(images, rects):
+                self.screen.blit(image, rect)
+            pygame.display.flip()
+            self.full_redraw = False
+        else:
+            dirty = ([rect for key, rect in current.items() if key not in self.previous] +
+                     [rect for key, rect in self.previous.items() if key not in current])
+            for area in dirty:
+                self.screen.set_clip(area)
+                self.screen.blit(self.background, area, area)
+                for i in area.collidelistall(rects):
+                    self.screen.blit(images[i], rects[i])
+            self.screen.set_clip(None)
+            pygame.display.update(dirty)
+
+        self.previous = current
+        self.previous_images = images
@@ -0,0 +1,93 @@
+# src/ui/spectator.py
+import queue
+from multiprocessing import get_context
+from src.constants import TILE_SIZE
+from src.game.episode_record import ReplaySnake
+
+# Episodes waiting for the viewer, the oldest is dropped when the trainer publishes into a full queue
+QUEUE_SIZE = 8
+
+
+class Spectator:
+    """
+    Trainer side of the spectator window. The window runs in its own process and plays the published
+    episodes at its own pace. Publishing never blocks, so training runs equally fast with or without it,
+    and closing the window only stops the viewer. pygame is only imported in the viewer process.
+
+    """
+
+    def __init__(self, queue_size=QUEUE_SIZE):
+        context = get_context()
+        self.queue = context.Queue(queue_size)
+        # Don't wait at exit for episodes nobody will read any more
+        self.queue.cancel_join_thread()
+        self.process = context.Process(target=run_viewer, args=(self.queue,), daemon=True)
+        self.process.start()
+
+    def publish(self, record, info):
+        """Hands an EpisodeRecord and its info lines to the viewer, returns False once its window is closed"""
+        if not self.process.is_alive():
+            return False
+
+        episode = (record, info)
+        try:
+            self.queue.put_nowait(episode)
+        except queue.Full:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(episode)
+            except queue.Full:
+                pass
+        return True
+
+    def close(self):
+        """Stops the viewer after at most a second, episodes still queued are dropped"""
+        if self.process.is_alive():
+            try:
+                self.queue.put_nowait(None)
+            except queue.Full:
+                pass
+            self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+
+
+def play_episode(view, snake, food, record, info):
+    """Draws one EpisodeRecord frame by frame, returns False when the window was closed"""
+    for step, (body, food_cell) in enumerate(record.frames()):
+        if view.quit_requested():
+            return False
+
+        snake.show(body, step < record.steps or record.death is None)
+        if food_cell is not None:
+            food.position = food_cell
+
+        info_lines = info + [f"Steps: {step}/{record.steps}", f"Body Length: {len(body)}"]
+        if not snake.alive:
+            info_lines.append(f"Died: {record.death}")
+        view.draw(snake, food, info_lines)
+    return True
+
+
+def run_viewer(episodes):
+    from ui.training_view import TrainingView
+    from src.game.item import Food
+
+    view = TrainingView()
+    snake = ReplaySnake(TILE_SIZE)
+    food = Food(view.screen.get_width(), view.screen.get_height(), TILE_SIZE)
+    playing = True
+    while playing and not view.quit_requested():
+        try:
+            episode = episodes.get(timeout=0.1)
+        except queue.Empty:
+            continue
+
+        if episode is None:
+            break
+        playing = play_episode(view, snake, food, *episode)
+    view.close()
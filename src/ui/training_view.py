@@ -0,0 +1,49 @@
+# src/ui/training_view.py
+import pygame
+from constants import WIDTH, HEIGHT, FPS, TILE_SIZE, ORB_COUNT, BG_PATH, ICON_PATH
+from ui.ambient_orb import AmbientOrb
+from src.ui.assets import load_image
+from src.ui.renderer import DirtyRenderer
+
+class TrainingView:
+    """Optional window that draws snakes while the trainer runs"""
+
+    def __init__(self):
+        pygame.init()
+        self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
+        pygame.display.set_caption("Snake AI Training")
+        self.clock = pygame.time.Clock()
+        self.font = pygame.font.SysFont(None, 18)
+
+        self.background = load_image(BG_PATH, (WIDTH, HEIGHT), alpha=False)
+        self.orbs = [AmbientOrb(WIDTH, HEIGHT, TILE_SIZE) for _ in range(ORB_COUNT)]
+        self.renderer = DirtyRenderer(self.screen, self.background)
+
+        icon = pygame.image.load(ICON_PATH)
+        pygame.display.set_icon(icon)
+
+    def quit_requested(self):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return True
+        return False
+
+    def draw(self, snake, food, info_lines):
+        # Background ambient orbs
+        for orb in self.orbs:
+            orb.update()
+        sprites = [orb.sprite() for orb in self.orbs]
+
+        sprites += snake.sprites()
+
+        food.update()
+        sprites.append(food.sprite())
+
+        for i, line in enumerate(info_lines):
+            sprites.append((self.renderer.text(self.font, line), (10, 10 + i * 24)))
+
+        self.renderer.draw(sprites)
+        self.clock.tick(FPS)
+
+    def close(self):
+        pygame.quit()
@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# The tests import the game as the src package, like the scripts do when run from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
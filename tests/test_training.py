@@ -0,0 +1,102 @@
+# tests/test_training.py
+import numpy as np
+from src.Brain.genetic_algorithm import GeneticAlgorithm
+from src.game.item import Food
+from src.game.population_sim import PopulationSimulator, START_DIRECTIONS, apply_results
+
+WIDTH, HEIGHT, TILE_SIZE = 800, 600, 20
+MAX_STEPS = 1000
+POPULATION_SIZE = 40
+
+
+class ScriptedSimulator(PopulationSimulator):
+    """PopulationSimulator with fixed start directions and food positions, so AISnake can replay the same episodes"""
+
+    def __init__(self, brains, directions, foods):
+        self.directions = directions
+        self.foods = foods
+        super().__init__(brains, WIDTH, HEIGHT, TILE_SIZE, MAX_STEPS)
+
+    def reset(self):
+        self.food_count = np.zeros(self.size, dtype=int)
+        super().reset()
+        self.direction = START_DIRECTIONS[self.directions].copy()
+
+    def place_food(self, rows):
+        self.food[rows] = self.foods[rows, self.food_count[rows]]
+        self.food_count[rows] += 1
+
+
+def play_classic(snake, direction, foods):
+    """Plays one episode with AISnake.update and the trainer's food handling"""
+    snake.reset(START_DIRECTIONS[direction])
+    food = Food(WIDTH, HEIGHT, TILE_SIZE)
+    eaten = 0
+    food.position = tuple(int(value) for value in foods[eaten])
+    steps = 0
+    while snake.alive and steps < MAX_STEPS:
+        snake.update(food)
+        if food.collision(snake.head_pos()):
+            snake.grow()
+            eaten += 1
+            food.position = tuple(int(value) for value in foods[eaten])
+        steps += 1
+    return snake_outcome(snake)
+
+
+def snake_outcome(snake):
+    return (snake.fitness, snake.food_eaten, snake.steps, snake.alive, snake.death_reason,
+            len(snake.body), snake.evaluate_final_fitness())
+
+
+def test_population_sim_matches_ai_snake():
+    np.random.seed(1)
+    ga = GeneticAlgorithm(POPULATION_SIZE, 4, 6, 3, WIDTH, HEIGHT, TILE_SIZE)
+    rng = np.random.RandomState(5)
+    foods = rng.randint(1, [WIDTH // TILE_SIZE - 1, HEIGHT // TILE_SIZE - 1], size=(POPULATION_SIZE, MAX_STEPS + 100, 2))
+    directions = rng.randint(len(START_DIRECTIONS), size=POPULATION_SIZE)
+
+    # A couple of generations, so some snakes live long enough to eat and hit the loop rules
+    for _ in range(3):
+        population = ga.get_population()
+        expected = [play_classic(snake, directions[i], foods[i]) for i, snake in enumerate(population)]
+
+        simulator = ScriptedSimulator([snake.brain for snake in population], directions, foods)
+        simulator.run()
+        apply_results(population, simulator.get_results())
+
+        for want, snake in zip(expected, population):
+            got = snake_outcome(snake)
+            assert np.isclose(got[0], want[0], rtol=1e-9, atol=1e-9)
+            assert got[1:6] == want[1:6]
+            assert np.isclose(got[6], want[6])
+
+        ga.create_next_generation()
+
+
+def test_checkpoint_round_trip(tmp_path):
+    np.random.seed(2)
+    ga = GeneticAlgorithm(POPULATION_SIZE, 4, 6, 3, WIDTH, HEIGHT, TILE_SIZE)
+    ga.evaluate_population(MAX_STEPS)
+    ga.create_next_generation()
+
+    path = tmp_path / "checkpoint.npz"
+    ga.save_checkpoint(str(path), extra={'best_fitness': 12.5})
+
+    ga.evaluate_population(MAX_STEPS)
+    ga.create_next_generation()
+    expected_genomes = ga.genomes.copy()
+    expected_history = list(ga.fitness_history)
+
+    # A different seed for the fresh GA, the checkpoint has to bring back the RNG state as well
+    np.random.seed(3)
+    restored = GeneticAlgorithm(POPULATION_SIZE, 4, 6, 3, WIDTH, HEIGHT, TILE_SIZE)
+    extra = restored.restore_checkpoint(GeneticAlgorithm.read_checkpoint(str(path)))
+    assert float(extra['best_fitness']) == 12.5
+    assert restored.generation == 1
+
+    restored.evaluate_population(MAX_STEPS)
+    restored.create_next_generation()
+    assert restored.generation == ga.generation
+    assert np.array_equal(restored.genomes, expected_genomes)
+    assert restored.fitness_history == expected_history